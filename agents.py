@@ -1,95 +1,239 @@
 import os
 import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrency import ToolBusyError, ToolGate
+from decompose import merge_responses, split_intents
+from intent_classifier import get_intent_classifier
+from streaming import TextStream
+from warmup import ModelWarmer
 from tools import ChatTool, WeatherTool, WebSearchTool, StringTool, CalculatorTool, ImageGenerationTool, NlpTool
 
+# Result of routing one query; returned per call so concurrent sessions never share it
+RouteResult = namedtuple("RouteResult", ["agent", "response"])
+
+# Per-tool admission control: (max concurrent calls, max queued calls, max wait in seconds).
+# The local HF pipelines are CPU bound, so they get the tightest limits.
+TOOL_LIMITS = {
+    "nlp": (2, 16, 60.0),
+    "image": (4, 16, 30.0),
+    "chat": (8, 32, 30.0),
+    "weather": (8, 32, 20.0),
+}
+
+# Compound queries ("weather in Delhi and calculate 15*23") run their parts concurrently;
+# parts still running after this many seconds are reported as timed out
+COMPOUND_DEADLINE = float(os.getenv("COMPOUND_DEADLINE", "30"))
+# Sub-calls outstanding at once across all sessions, counting ones abandoned past the deadline.
+# The pool has a thread per slot, so a stuck upstream can never queue later compound queries
+# behind it; parts beyond the limit are answered with a busy message instead.
+COMPOUND_WORKERS = int(os.getenv("COMPOUND_WORKERS", "16"))
+
+# Minimum classifier probability to override the keyword rules; INTENT_CLASSIFIER=0 disables it
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.7"))
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "1") == "1"
+
+TOOL_AGENT_NAMES = {
+    "nlp": "NLPTool",
+    "weather": "WeatherTool",
+    "search": "WebSearchTool",
+    "calculator": "CalculatorTool",
+    "string": "StringTool",
+    "image": "ImageGenerationTool",
+    "chat": "ChatTool",
+}
+
+def rule_tool(query):
+    """Keyword-rule routing: the tool key for a query"""
+    query_lower = query.lower()
+
+    # NLP routing - must come before weather
+    nlp_keywords = [
+        "summarize", "extract", "tokenize", "sentiment",
+        "translate", "nlp", "entities", "keywords", "paraphrase"
+    ]
+    if any(query_lower.startswith(k) or query_lower.startswith(k + ":") for k in nlp_keywords):
+        return "nlp"
+
+    # Weather routing
+    elif any(word in query_lower for word in [
+        "weather", "temperature", "forecast", "climate",
+        "rain", "sunny", "cloudy", "humidity", "wind"
+    ]):
+        return "weather"
+
+    # Search routing
+    elif any(re.search(rf"\b{word}\b", query_lower)
+             for word in ["search for", "find information", "lookup", "google", "duckduckgo"]) or \
+         query_lower.startswith(("search ", "find ", "lookup ")):
+        return "search"
+
+    # Calculator routing
+    elif any(word in query_lower for word in [
+        "calculate", "math", "solve", "equation", "factorial",
+        "square root", "sqrt", "sin", "cos", "tan", "log", "power"
+    ]) or re.search(r'[\d\+\-\*\/\=\^\(\)]+', query_lower):
+        return "calculator"
+
+    # String operations routing
+    elif any(re.search(rf"\b{word}\b", query_lower)
+             for word in ["uppercase", "lowercase", "reverse string", "string length",
+                          "count characters", "capitalize", "replace text"]) or \
+         query_lower.startswith(("make uppercase", "make lowercase", "reverse ", "count ", "replace ")):
+        return "string"
+
+    # Image generation routing
+    elif any(re.search(rf"\b{word}\b", query_lower)
+             for word in ["generate image", "create image", "draw picture", "make picture"]) or \
+         query_lower.startswith(("generate ", "create ", "draw ", "make ")):
+        return "image"
+
+    # Default to chat
+    return "chat"
+
+
 class MasterAgent:
-    def __init__(self):
+    def __init__(self, tools=None):
+        """`tools` maps tool keys to ready-made instances used instead of the defaults (e.g. fakes)"""
         print("🤖 Initializing Multi-Agent System...")
-        
-        self.tools = {
-            "chat": ChatTool(),
-            "weather": WeatherTool(),
-            "search": WebSearchTool(),
-            "calculator": CalculatorTool(),
-            "string": StringTool(),
-            "image": ImageGenerationTool(),
-            "nlp": NlpTool()
+
+        factories = {
+            "chat": ChatTool,
+            "weather": WeatherTool,
+            "search": WebSearchTool,
+            "calculator": CalculatorTool,
+            "string": StringTool,
+            "image": ImageGenerationTool,
+            "nlp": NlpTool
+        }
+        overrides = tools or {}
+        self.tools = {key: overrides[key] if key in overrides else factory() for key, factory in factories.items()}
+        self.gates = {
+            key: ToolGate(TOOL_AGENT_NAMES[key], limit, max_queue, timeout)
+            for key, (limit, max_queue, timeout) in TOOL_LIMITS.items()
         }
-        self.last_agent_used = "ChatTool"
+        # Started by the app; warms the NLP pipelines off the request path
+        self.warmer = ModelWarmer(self.tools["nlp"].warmup_targets(), gate=self.gates["nlp"])
+        # Routing model: hashed n-grams + linear layer, falls back to rule_tool() when unsure
+        self.intents = get_intent_classifier() if INTENT_CLASSIFIER else None
+        self.executor = ThreadPoolExecutor(max_workers=COMPOUND_WORKERS, thread_name_prefix="sub-intent")
+        self.compound_slots = threading.BoundedSemaphore(COMPOUND_WORKERS)
         print("✅ All agents initialized successfully!")
-        
-    def route(self, query):
-        """Route query to appropriate tool"""
+
+    def select_tool(self, query):
+        """Pick the tool key for a query.
+
+        Explicit NLP commands ("summarize: ...") always win; otherwise the
+        intent classifier decides when it is confident and the keyword rules
+        handle the rest.
+        """
+        rule_key = rule_tool(query)
+        if rule_key == "nlp" or self.intents is None:
+            return rule_key
+        label, confidence = self.intents.predict(query)
+        if confidence >= INTENT_CONFIDENCE and label in TOOL_AGENT_NAMES:
+            return label
+        return rule_key
+
+    def standalone_chat(self, text):
+        """True when the classifier is confident text is a chat question in its own right"""
+        if self.intents is None:
+            return False
+        label, confidence = self.intents.predict(text)
+        return label == "chat" and confidence >= INTENT_CONFIDENCE
+
+    def call_tool(self, key, query, context=None):
+        """Run one tool under its admission gate"""
+        gate = self.gates.get(key)
+        if gate is None:
+            return self.tools[key].handle_input(query, context)
         try:
-            if not query or not isinstance(query, str):
-                return "Please provide a valid question."
-                
-            query_lower = query.lower()
-
-            # NLP routing - must come before weather
-            nlp_keywords = [
-                "summarize", "extract", "tokenize", "sentiment",
-                "translate", "nlp", "entities", "keywords", "paraphrase"
-            ]
-            if any(query_lower.startswith(k) or query_lower.startswith(k + ":") for k in nlp_keywords):
-                self.last_agent_used = "NLPTool"
-                return self.tools["nlp"].handle_input(query)
-
-            # Weather routing
-            elif any(word in query_lower for word in [
-                "weather", "temperature", "forecast", "climate", 
-                "rain", "sunny", "cloudy", "humidity", "wind"
-            ]):
-                self.last_agent_used = "WeatherTool"
-                return self.tools["weather"].handle_input(query)
-
-            # Search routing
-            elif any(re.search(rf"\b{word}\b", query_lower) 
-                     for word in ["search for", "find information", "lookup", "google", "duckduckgo"]) or \
-                 query_lower.startswith(("search ", "find ", "lookup ")):
-                self.last_agent_used = "WebSearchTool"
-                return self.tools["search"].handle_input(query)
-            
-            # Calculator routing
-            elif any(word in query_lower for word in [
-                "calculate", "math", "solve", "equation", "factorial", 
-                "square root", "sqrt", "sin", "cos", "tan", "log", "power"
-            ]) or re.search(r'[\d\+\-\*\/\=\^\(\)]+', query_lower):
-                self.last_agent_used = "CalculatorTool"
-                return self.tools["calculator"].handle_input(query)
-            
-            # String operations routing
-            elif any(re.search(rf"\b{word}\b", query_lower) 
-                     for word in ["uppercase", "lowercase", "reverse string", "string length", 
-                                  "count characters", "capitalize", "replace text"]) or \
-                 query_lower.startswith(("make uppercase", "make lowercase", "reverse ", "count ", "replace ")):
-                self.last_agent_used = "StringTool"
-                return self.tools["string"].handle_input(query)
-            
-            # Image generation routing
-            elif any(re.search(rf"\b{word}\b", query_lower) 
-                     for word in ["generate image", "create image", "draw picture", "make picture"]) or \
-                 query_lower.startswith(("generate ", "create ", "draw ", "make ")):
-                self.last_agent_used = "ImageGenerationTool"
-                result = self.tools["image"].handle_input(query)
-                if isinstance(result, dict) and result.get("type") == "image":
-                    return {
-                        "type": "image",
-                        "image_path": result.get("image_path"),
-                        "message": result.get("message")
-                    }
-                return result
-            
-            # Default to chat
+            gate.acquire()
+        except ToolBusyError as e:
+            return f"⏳ {e}. Please try again in a moment."
+        result = None
+        try:
+            result = self.tools[key].handle_input(query, context)
+            return result
+        finally:
+            if isinstance(result, TextStream):
+                # Generation continues after we return; keep the slot until it ends
+                result.add_done_callback(gate.release)
             else:
-                self.last_agent_used = "ChatTool"
-                return self.tools["chat"].handle_input(query)
-                
+                gate.release()
+
+    def dispatch(self, query, context=None):
+        """Route query to appropriate tool and report which agent handled it.
+
+        `context` is an optional per-session dict tools may read and update
+        (e.g. the last city asked about), since the agent itself is shared.
+        With context["stream"] set, slow generations (summarize, paraphrase)
+        come back as a TextStream of partial text instead of a string.
+        """
+        try:
+            if not query or not isinstance(query, str):
+                return RouteResult(None, "Please provide a valid question.")
+
+            intents = split_intents(query, self.select_tool, self.standalone_chat)
+            if len(intents) > 1:
+                return self.dispatch_compound(intents, context)
+
+            key = intents[0].key
+            result = self.call_tool(key, query, context)
+
+            if key == "image" and isinstance(result, dict) and result.get("type") == "image":
+                result = {
+                    "type": "image",
+                    "image_path": result.get("image_path"),
+                    "message": result.get("message")
+                }
+            return RouteResult(TOOL_AGENT_NAMES[key], result)
+
         except Exception as e:
-            return f"Routing error: {str(e)}"
+            return RouteResult(None, f"Routing error: {str(e)}")
+
+    def dispatch_compound(self, intents, context=None, deadline=COMPOUND_DEADLINE):
+        """Run independent sub-intents concurrently and merge whatever finishes before the deadline"""
+        started = time.monotonic()
+        futures = []
+        for intent in intents:
+            if not self.compound_slots.acquire(blocking=False):
+                futures.append(None)
+                continue
+            future = self.executor.submit(self.call_tool, intent.key, intent.text, context)
+            # The slot is held until the call ends, even after the deadline has given up on it
+            future.add_done_callback(lambda _: self.compound_slots.release())
+            futures.append(future)
+        wait([f for f in futures if f is not None], timeout=deadline)
+
+        parts = []
+        for intent, future in zip(intents, futures):
+            agent = TOOL_AGENT_NAMES[intent.key]
+            if future is None:
+                response = f"⏳ Too many compound questions are in progress; ask {agent} on its own or try again in a moment."
+            elif not future.done():
+                # Left running; its gate slot is released when it finishes
+                response = f"⏱️ {agent} did not answer within {deadline:.0f}s. Try asking it on its own."
+            elif future.exception() is not None:
+                response = f"Routing error: {future.exception()}"
+            else:
+                response = future.result()
+                if isinstance(response, TextStream):
+                    response = response.read(timeout=max(0.0, deadline - (time.monotonic() - started)))
+            parts.append((intent, response))
+        agents = "+".join(TOOL_AGENT_NAMES[intent.key] for intent in intents)
+        return RouteResult(agents, merge_responses(parts))
+
+    def route(self, query, context=None):
+        """Route query to appropriate tool"""
+        return self.dispatch(query, context).response
 
-    def handle_user_input(self, query):
+    def handle_user_input(self, query, context=None):
         """Alternative method name for compatibility"""
-        return self.route(query)
+        return self.route(query, context)
 
-    
+    def gate_states(self):
+        """Snapshot of every tool gate, for observability"""
+        return {gate.name: gate.snapshot() for gate in self.gates.values()}
@@ -1,8 +1,16 @@
 import streamlit as st
 # from agents import MasterAgent
 from agents import MasterAgent  # Update this path if MasterAgent is defined elsewhere
+from resilience import endpoint_states
+from ratelimit import limiter_states
+from history import SessionHistory
+from warmup import start_health_server
+from documents import DocumentJob, detect_format
+from streaming import TextStream
+from tools import NLP_BATCH_SIZE
 import os
 import time
+import uuid
 from datetime import datetime
 from typing import Union, Dict, Any
 # ✅ Configure Streamlit
@@ -11,7 +19,14 @@ st.set_page_config(page_title="Multi-Agent Chatbot", page_icon="🤖", layout="w
 # ✅ Initialize Agent
 @st.cache_resource
 def get_master_agent():
-    return MasterAgent()
+    agent = MasterAgent()
+    agent.warmer.start()
+    agent.tools["weather"].refresher.start()
+    # Readiness probe for the load balancer, separate from Streamlit's own port
+    health_port = os.getenv("HEALTH_PORT")
+    if health_port:
+        start_health_server(agent.warmer, int(health_port))
+    return agent
 
 # ✅ Custom CSS for better message alignment
 st.markdown("""
@@ -100,11 +115,23 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+GREETING = "Hello 👋 I'm your assistant. Ask me anything!"
+OLDER_PAGE_SIZE = 20
+# Where bulk document jobs write their results
+NLP_JOB_DIR = os.getenv("NLP_JOB_DIR", ".nlp_jobs")
+NLP_PREFETCH_BATCHES = int(os.getenv("NLP_PREFETCH_BATCHES", "4"))
+
 # ✅ Initialize session state FIRST
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "ai", "content": "Hello 👋 I'm your assistant. Ask me anything!"}
-    ]
+if "history" not in st.session_state:
+    st.session_state.history = SessionHistory(uuid.uuid4().hex)
+    st.session_state.history.append("ai", GREETING)
+
+if "older_shown" not in st.session_state:
+    st.session_state.older_shown = 0
+
+# Per-session state tools can use for follow-ups (the agent itself is shared)
+if "agent_context" not in st.session_state:
+    st.session_state.agent_context = {"session_id": st.session_state.history.session_id, "stream": True}
 
 if "master_agent" not in st.session_state:
     st.session_state.master_agent = get_master_agent()
@@ -115,16 +142,17 @@ with st.sidebar:
     
     # Clear chat button
     if st.button("🗑️ Clear Chat", type="primary"):
-        st.session_state.messages = [
-            {"role": "ai", "content": "Hello 👋 I'm your assistant. Ask me anything!"}
-        ]
+        st.session_state.history.clear()
+        st.session_state.history.append("ai", GREETING)
+        st.session_state.older_shown = 0
+        st.session_state.agent_context.pop("weather_city", None)
         st.rerun()
     
     # Export/Download chat
-    if len(st.session_state.messages) > 1:
+    if len(st.session_state.history) > 1:
         # Prepare chat content for download
         chat_content = ""
-        for msg in st.session_state.messages:
+        for msg in st.session_state.history.iter_all():
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             sender = "You" if msg["role"] == "user" else "Assistant"
             chat_content += f"[{timestamp}] {sender}: {msg['content']}\n\n"
@@ -139,6 +167,109 @@ with st.sidebar:
         st.info("No chat history to download")
     
     st.divider()
+
+    # Bulk NLP over an uploaded file
+    with st.expander("📄 Document Processing"):
+        upload = st.file_uploader("CSV, TXT or JSONL", type=["csv", "txt", "jsonl", "ndjson"])
+        task = st.selectbox("Task", DocumentJob.TASK_LABELS, format_func=DocumentJob.TASK_LABELS.get)
+        text_column = st.text_input("Text column/field (optional)")
+        if upload is not None and st.button("▶️ Process file"):
+            agent = st.session_state.master_agent
+            os.makedirs(NLP_JOB_DIR, exist_ok=True)
+            fmt = detect_format(upload.name)
+            stem = os.path.splitext(os.path.basename(upload.name))[0]
+            output_path = os.path.join(
+                NLP_JOB_DIR, f"{stem}_{task}_{uuid.uuid4().hex[:8]}.{'csv' if fmt == 'csv' else 'jsonl'}"
+            )
+            bar = st.progress(0.0, text="Starting...")
+            status = st.empty()
+
+            def show_progress(progress):
+                bar.progress(progress.fraction, text=f"{progress.records} records · {progress.batches} batches")
+                status.caption(
+                    f"⚡ {progress.records_per_second:.1f} records/s · {progress.elapsed:.1f}s elapsed"
+                    f"{f' · {progress.failed} failed' if progress.failed else ''}"
+                )
+
+            try:
+                job = DocumentJob(agent.tools["nlp"], task, NLP_BATCH_SIZE, NLP_PREFETCH_BATCHES, gate=agent.gates["nlp"])
+                job.run(upload, fmt, output_path, text_field=text_column.strip() or None, on_progress=show_progress)
+                st.session_state.document_output = output_path
+            except Exception as e:
+                st.error(f"⚠️ Document processing failed: {e}")
+        output_path = st.session_state.get("document_output")
+        if output_path and os.path.exists(output_path):
+            with open(output_path, "rb") as f:
+                st.download_button("💾 Download results", f, file_name=os.path.basename(output_path))
+
+    # Model warm-up / readiness
+    warmup = st.session_state.master_agent.warmer.report()
+    if warmup["ready"]:
+        st.success("🟢 Models warm and ready")
+    elif warmup["status"] == "degraded":
+        st.error(f"🔴 Warm-up failed for: {', '.join(warmup['failed'])}")
+    else:
+        st.warning("🟡 Warming up models — first NLP replies may be slow")
+    with st.expander("🔥 Model Warm-up"):
+        for name, entry in warmup["models"].items():
+            seconds = f" in {entry['seconds']:.2f}s" if entry["seconds"] is not None else ""
+            st.caption(f"{name}: {entry['state']}{seconds}")
+
+    # NLP model residency
+    with st.expander("🧠 NLP Models"):
+        residency = st.session_state.master_agent.tools["nlp"].models.stats()
+        budget = residency["budget_bytes"]
+        st.caption(
+            f"resident {residency['resident_bytes'] / 2**20:.0f} MB"
+            f"{f' of {budget / 2**20:.0f} MB' if budget else ''} · "
+            f"loads {residency['loads']} · evictions {residency['evictions']}"
+        )
+        translations = st.session_state.master_agent.tools["nlp"].sentence_translator.stats()
+        if translations["hits"] + translations["misses"]:
+            st.caption(
+                f"translation cache {translations['cached']} sentences · "
+                f"hit ratio {translations['hit_ratio']:.0%} · {translations['batches']} batches"
+            )
+        for name, entry in residency["models"].items():
+            load_seconds = residency.get("load_seconds", {}).get(name)
+            loaded_in = f" · loaded in {load_seconds:.1f}s" if load_seconds is not None else ""
+            st.caption(f"{'📌' if entry['pinned'] else '•'} {name}: {entry['bytes'] / 2**20:.0f} MB{loaded_in}")
+
+    # Weather cache and background refresh of popular cities
+    with st.expander("🌤️ Weather Cache"):
+        weather = st.session_state.master_agent.tools["weather"]
+        cache = weather.records.stats()
+        refresh = weather.refresher.stats()
+        hit_ratio = f"{cache['hit_ratio']:.0%}" if cache["hit_ratio"] is not None else "n/a"
+        hot_ratio = f"{refresh['hot_hit_ratio']:.0%}" if refresh["hot_hit_ratio"] is not None else "n/a"
+        st.caption(f"hit ratio {hit_ratio} · popular cities {hot_ratio} · {cache['entries']} cached")
+        st.caption(f"background refreshes {refresh['refreshes']} · failures {refresh['failures']}")
+        for location, score in refresh["top"]:
+            st.caption(f"• {location} ({score})")
+
+    # Circuit breaker state for external services
+    with st.expander("🩺 Service Health"):
+        states = endpoint_states()
+        if not states:
+            st.caption("No external calls made yet")
+        for name, state in states.items():
+            icon = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}.get(state["state"], "⚪")
+            st.markdown(f"{icon} **{name}** — {state['state']}")
+            st.caption(
+                f"timeout {state['timeout']}s · p50 {state['p50_latency']}s · "
+                f"failures {state['failures']} · rejected {state['rejected']}"
+            )
+        for name, limiter in limiter_states().items():
+            recent = limiter["per_minute"][-1] if limiter["per_minute"] else {"allowed": 0, "queued": 0, "shed": 0}
+            st.caption(
+                f"🚦 {name}: {limiter['available']:.0f}/{limiter['burst']} tokens · {limiter['rate_per_min']:g}/min · "
+                f"this minute {recent['allowed']} sent, {recent['queued']} queued, {recent['shed']} shed"
+            )
+        for name, gate in st.session_state.master_agent.gate_states().items():
+            st.caption(
+                f"⚙️ {name}: {gate['active']}/{gate['limit']} running · "
+                f"{gate['waiting']} queued · {gate['rejected'] + gate['timed_out']} turned away"
+            )
     
 
 # ✅ Main chat area
@@ -149,7 +280,16 @@ message_container = st.container()
 
 # ✅ Display messages ONCE
 with message_container:
-    for i, msg in enumerate(st.session_state.messages):
+    history = st.session_state.history
+    hidden = history.older_count() - st.session_state.older_shown
+    if hidden > 0:
+        # Older turns live on disk and are only read back when asked for
+        if st.button(f"⬆️ Load earlier messages ({hidden} more)"):
+            st.session_state.older_shown += OLDER_PAGE_SIZE
+            st.rerun()
+    visible = history.older(st.session_state.older_shown) + history.recent()
+
+    for i, msg in enumerate(visible):
         if msg["role"] == "user":
             # User message - aligned to right
             st.markdown(
@@ -189,20 +329,37 @@ with message_container:
 
 # ✅ Chat input at bottom using native Streamlit
 if user_input := st.chat_input("Say something to Ramana..."):
-    st.session_state.messages.append({"role": "user", "content": user_input})
+    st.session_state.history.append("user", user_input)
 
     try:
-        response = st.session_state.master_agent.route(user_input.strip())
+        response = st.session_state.master_agent.route(user_input.strip(), st.session_state.agent_context)
         if response is None:
             ai_reply = "Sorry, I couldn't process your request. Please try again."
         elif isinstance(response, dict) and response.get("type") == "image":
             ai_reply = response  # keep dict so renderer knows it's an image
+        elif isinstance(response, TextStream):
+            # Show the question and the reply as it is generated, before the rerun redraws history
+            st.markdown(
+                f'<div class="user-message"><div class="user-bubble">{user_input}</div></div>',
+                unsafe_allow_html=True
+            )
+            bubble = st.empty()
+            try:
+                for _ in response:
+                    bubble.markdown(
+                        f'<div class="bot-message"><div class="bot-bubble">{response.text} ▌</div></div>',
+                        unsafe_allow_html=True
+                    )
+            finally:
+                # Stops decoding if this run is interrupted (new message, user left)
+                response.cancel()
+            ai_reply = response.text
         else:
             ai_reply = str(response)
     except Exception as e:
         ai_reply = f"⚠️ Error: {str(e)}"
 
-    st.session_state.messages.append({"role": "ai", "content": ai_reply})
+    st.session_state.history.append("ai", ai_reply)
     st.rerun()
 
 # ✅ Auto-scroll (optional, works with your custom bubbles)
@@ -0,0 +1,142 @@
+"""Local model artifacts for offline, memory-mapped NLP model loading.
+
+Export every NlpTool model once (needs network):
+
+    python artifacts.py export --dir /srv/nlp-models
+
+then run with NLP_ARTIFACT_DIR=/srv/nlp-models. Each model is loaded from
+its own directory in safetensors format with the Hugging Face hub switched
+to offline mode, so production never touches the network.
+
+    python artifacts.py verify --dir /srv/nlp-models
+"""
+import argparse
+import hashlib
+import json
+import os
+
+MANIFEST = "manifest.json"
+
+
+def enable_offline_mode():
+    """Stop transformers / huggingface_hub from reaching the network; call before importing them"""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+
+def artifact_path(artifact_dir, name):
+    return os.path.join(artifact_dir, name)
+
+
+def load_artifact(artifact_dir, name, spec):
+    """Build a pipeline (or tokenizer) for `name` from its pinned local directory.
+
+    Weights are read from safetensors, which is parsed without unpickling and
+    read through mmap, so the file's pages sit in the shared page cache.
+    """
+    from transformers import AutoTokenizer, pipeline
+
+    task, hub_id, kwargs = spec
+    path = artifact_path(artifact_dir, name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(
+            f"No local artifact for '{name}' ({hub_id}) in {artifact_dir}; run: python artifacts.py export --dir {artifact_dir}"
+        )
+
+    if task is None:
+        return AutoTokenizer.from_pretrained(path, local_files_only=True)
+    return pipeline(
+        task,
+        model=path,
+        tokenizer=path,
+        model_kwargs={"use_safetensors": True, "local_files_only": True, "low_cpu_mem_usage": True},
+        **kwargs,
+    )
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_hashes(path):
+    hashes = {}
+    for root, _, files in os.walk(path):
+        for filename in sorted(files):
+            full = os.path.join(root, filename)
+            hashes[os.path.relpath(full, path)] = _sha256(full)
+    return hashes
+
+
+def export(artifact_dir, specs):
+    """Download each model from the hub and save it as a safetensors artifact"""
+    from transformers import AutoTokenizer, pipeline
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    manifest = {}
+    for name, (task, hub_id, kwargs) in specs.items():
+        path = artifact_path(artifact_dir, name)
+        print(f"📥 Exporting {name} ({hub_id}) -> {path}")
+        if task is None:
+            AutoTokenizer.from_pretrained(hub_id).save_pretrained(path)
+        else:
+            pipe = pipeline(task, model=hub_id, **kwargs)
+            pipe.model.save_pretrained(path, safe_serialization=True)
+            pipe.tokenizer.save_pretrained(path)
+        manifest[name] = {"task": task, "hub_id": hub_id, "files": _file_hashes(path)}
+
+    with open(os.path.join(artifact_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ Exported {len(manifest)} models to {artifact_dir}")
+
+
+def verify(artifact_dir, specs):
+    """Check every artifact against the manifest; returns a list of problems"""
+    manifest_path = os.path.join(artifact_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return [f"missing {manifest_path}"]
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    problems = []
+    for name, (task, hub_id, _) in specs.items():
+        entry = manifest.get(name)
+        if entry is None or entry["hub_id"] != hub_id:
+            problems.append(f"{name}: not exported for {hub_id}")
+            continue
+        path = artifact_path(artifact_dir, name)
+        if task is not None and not any(f.endswith(".safetensors") for f in entry["files"]):
+            problems.append(f"{name}: no safetensors weights")
+        for filename, expected in entry["files"].items():
+            full = os.path.join(path, filename)
+            if not os.path.exists(full):
+                problems.append(f"{name}: missing {filename}")
+            elif _sha256(full) != expected:
+                problems.append(f"{name}: {filename} does not match manifest")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage local NLP model artifacts")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--dir", default=os.getenv("NLP_ARTIFACT_DIR", "nlp_models"))
+    args = parser.parse_args()
+
+    from tools import NLP_MODEL_SPECS
+
+    if args.command == "export":
+        export(args.dir, NLP_MODEL_SPECS)
+    else:
+        problems = verify(args.dir, NLP_MODEL_SPECS)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            raise SystemExit(1)
+        print(f"✅ All artifacts in {args.dir} match the manifest")
+
+
+if __name__ == "__main__":
+    main()
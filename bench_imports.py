@@ -0,0 +1,89 @@
+"""Import-time benchmark for the lightweight entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter, prints
+a per-package breakdown and fails if a heavy dependency gets pulled in at
+import time or the total exceeds its budget.
+
+    python bench_imports.py                 # check tools and agents
+    python bench_imports.py tools --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Packages that must only load inside the tools that use them
+HEAVY_PACKAGES = ["torch", "transformers", "google.generativeai", "streamlit", "requests", "numpy"]
+
+# Total cumulative import time allowed per module, in milliseconds
+DEFAULT_BUDGETS_MS = {
+    "tools": 300,
+    "agents": 300,
+}
+
+
+def measure(module):
+    """Return (total_us, {package: self_us}, [imported module names]) for importing module"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    per_package = defaultdict(int)
+    imported = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        imported.append(name)
+        per_package[name.split(".")[0]] += int(self_us)
+        # Top-level entries (no leading indentation) carry the full cumulative cost
+        if name == module:
+            total_us = int(cumulative_us)
+    return total_us, dict(per_package), imported
+
+
+def heavy_imports(imported):
+    found = set()
+    for name in imported:
+        for heavy in HEAVY_PACKAGES:
+            if name == heavy or name.startswith(heavy + "."):
+                found.add(heavy)
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_BUDGETS_MS))
+    parser.add_argument("--top", type=int, default=10, help="packages to list per module")
+    parser.add_argument("--budget-ms", type=float, help="override the per-module budget")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        total_us, per_package, imported = measure(module)
+        budget_ms = args.budget_ms or DEFAULT_BUDGETS_MS.get(module, 300)
+        print(f"\n📦 import {module}: {total_us / 1000:.1f} ms (budget {budget_ms:.0f} ms)")
+        for package, self_us in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"   {package:<28} {self_us / 1000:8.1f} ms")
+
+        heavy = heavy_imports(imported)
+        if heavy:
+            print(f"❌ {module} imports heavy packages at import time: {', '.join(heavy)}")
+            failed = True
+        if total_us / 1000 > budget_ms:
+            print(f"❌ {module} import time over budget")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ Import times within budget")
+
+
+if __name__ == "__main__":
+    main()
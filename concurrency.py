@@ -0,0 +1,78 @@
+import threading
+from collections import deque
+
+
+class ToolBusyError(Exception):
+    """Raised when a tool's wait queue is full or the wait timed out"""
+
+
+class ToolGate:
+    """FIFO admission control for one shared tool.
+
+    At most `limit` callers run at once, at most `max_queue` wait behind them,
+    and waiters are admitted strictly in arrival order.
+    """
+
+    def __init__(self, name, limit, max_queue=16, timeout=30.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise ToolBusyError(f"{self.name} is busy ({len(self._waiters)} requests already waiting)")
+            turn = threading.Event()
+            self._waiters.append(turn)
+
+        if turn.wait(timeout):
+            return
+
+        with self._lock:
+            # The permit may have been handed over between the timeout and taking the lock
+            if turn.is_set():
+                return
+            self._waiters.remove(turn)
+            self.timed_out += 1
+        raise ToolBusyError(f"{self.name} is busy (waited {timeout:.0f}s)")
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the permit straight to the oldest waiter
+                self.admitted += 1
+                self._waiters.popleft().set()
+            else:
+                self.active -= 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
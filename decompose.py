@@ -0,0 +1,94 @@
+import re
+
+# Phrases that join independent requests: "weather in Delhi and calculate 15*23"
+_SEPARATOR = re.compile(r"(\s*(?:;|\?|&|\band then\b|\band also\b|\bthen\b|\balso\b|\band\b)\s*)", re.IGNORECASE)
+
+# Tools whose whole query is their input text ("summarize: rain and floods ..."); never split those
+PAYLOAD_TOOLS = {"nlp", "string", "image", "search"}
+
+MAX_INTENTS = 4
+# Shorter chat fragments are not a question of their own ("Tobago" in "weather in Trinidad and Tobago")
+MIN_CHAT_WORDS = 3
+# Follow-ups that lean on the previous part ("will it rain today? what about tomorrow")
+_ELLIPTICAL = re.compile(r"^(?:(?:what|how)\s+about|what\s+if|and|or|but|so|same)\b", re.IGNORECASE)
+
+
+class SubIntent:
+    __slots__ = ("key", "text")
+
+    def __init__(self, key, text):
+        self.key = key
+        self.text = text
+
+    def __repr__(self):
+        return f"SubIntent({self.key!r}, {self.text!r})"
+
+
+def split_intents(query, select_tool, standalone_chat=None):
+    """Split a compound query into independent sub-intents, one per tool call.
+
+    `select_tool` maps text to a tool key. A fragment routed to chat is part
+    of its neighbour ("will it rain today? what about tomorrow") unless it is
+    clearly a question of its own: `standalone_chat(text)` (e.g. a confident
+    classifier) says so and it is not an elliptical follow-up. So "what is
+    machine learning? also what is 2+2" becomes a chat and a calculator
+    intent. Empty fragments and fragments for the same tool as their
+    neighbour are glued back on too ("weather in Trinidad and Tobago").
+    Returns a single intent for the whole query when there is nothing to split.
+    """
+    whole = [SubIntent(select_tool(query), query)]
+    if whole[0].key in PAYLOAD_TOOLS:
+        return whole
+
+    pieces = _SEPARATOR.split(query)
+    intents = []
+    leading = ""
+    separator = ""
+    for index, piece in enumerate(pieces):
+        if index % 2:
+            separator = piece
+            continue
+        text = piece.strip()
+        key = select_tool(text) if text else None
+        if key == "chat" and not _standalone(text, standalone_chat):
+            key = None
+        if key is None:
+            # Not an intent of its own; part of the previous one, or of the next if nothing came before
+            if intents:
+                intents[-1].text = f"{intents[-1].text}{separator}{piece}"
+            else:
+                leading = f"{leading}{separator}{piece}"
+        elif intents and key == intents[-1].key:
+            intents[-1].text = f"{intents[-1].text}{separator}{piece}"
+        else:
+            intents.append(SubIntent(key, f"{leading}{separator}{piece}" if leading.strip() else text))
+            leading = ""
+
+    if len(intents) < 2 or len(intents) > MAX_INTENTS:
+        return whole
+    for intent in intents:
+        intent.text = intent.text.strip(" ?;&")
+    return intents
+
+
+def _standalone(text, standalone_chat):
+    return (
+        standalone_chat is not None and len(text.split()) >= MIN_CHAT_WORDS
+        and not _ELLIPTICAL.match(text) and standalone_chat(text)
+    )
+
+
+def merge_responses(parts):
+    """Combine [(SubIntent, response)] into one reply; an image response keeps its image"""
+    sections = []
+    image = None
+    for intent, response in parts:
+        if isinstance(response, dict) and response.get("type") == "image":
+            if image is None:
+                image = response
+            response = response.get("message", "Generated Image")
+        sections.append(f"▶️ {intent.text}\n{response}")
+    text = "\n\n".join(sections)
+    if image is not None:
+        return {"type": "image", "image_path": image.get("image_path"), "message": text}
+    return text
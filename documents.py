@@ -0,0 +1,261 @@
+"""Bulk NLP over uploaded documents.
+
+Records are read from a CSV, TXT (one record per line) or JSONL file on a
+background thread into a bounded queue of model-sized batches, run through
+NlpTool.run_batch() and appended to the output file as each batch finishes,
+so memory stays flat however large the upload is.
+"""
+import csv
+import io
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+
+TEXT_FIELDS = ("text", "review", "content", "body", "comment", "message", "sentence")
+FORMATS = ("csv", "txt", "jsonl")
+
+_END = object()
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext == "ndjson":
+        return "jsonl"
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type '.{ext}'; upload CSV, TXT or JSONL")
+    return ext
+
+
+def _text_field(fields, text_field):
+    if text_field:
+        if text_field not in fields:
+            raise ValueError(f"Column '{text_field}' not found; available: {', '.join(fields)}")
+        return text_field
+    lowered = {f.lower(): f for f in fields}
+    for candidate in TEXT_FIELDS:
+        if candidate in lowered:
+            return lowered[candidate]
+    return fields[0]
+
+
+def read_records(stream, fmt, text_field=None):
+    """Yield (record, text) from a binary file object; record is a dict of the original fields"""
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "txt":
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield {"text": line}, line
+    elif fmt == "csv":
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames:
+            return
+        field = _text_field(reader.fieldnames, text_field)
+        for row in reader:
+            yield row, (row.get(field) or "").strip()
+    elif fmt == "jsonl":
+        field = None
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+            if not isinstance(record, dict):
+                record = {"text": record}
+            if field is None:
+                field = _text_field(list(record), text_field)
+            yield record, str(record.get(field) or "").strip()
+    else:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+
+# Columns a CSV output gains per task
+RESULT_COLUMNS = {
+    "sentiment": ["sentiment_label", "sentiment_score"],
+    "ner": ["entities"],
+    "translate": ["translation"],
+}
+
+
+def _flatten(task, result):
+    """Result columns for CSV output"""
+    if result is None:
+        return dict.fromkeys(RESULT_COLUMNS[task], "")
+    if isinstance(result, dict) and "error" in result:
+        return {"error": result["error"]}
+    if task == "sentiment":
+        return {"sentiment_label": result["label"], "sentiment_score": result["score"]}
+    if task == "ner":
+        return {"entities": "; ".join(f"{e['entity']}:{e['word']}" for e in result)}
+    return {"translation": result}
+
+
+class JobProgress:
+    __slots__ = ("records", "batches", "failed", "bytes_read", "total_bytes", "elapsed", "done")
+
+    def __init__(self, total_bytes):
+        self.records = 0
+        self.batches = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self.total_bytes = total_bytes
+        self.elapsed = 0.0
+        self.done = False
+
+    @property
+    def fraction(self):
+        if self.done:
+            return 1.0
+        return min(self.bytes_read / self.total_bytes, 0.99) if self.total_bytes else 0.0
+
+    @property
+    def records_per_second(self):
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+class DocumentJob:
+    """Stream one uploaded file through an NLP task into an output file.
+
+    A reader thread fills a queue of at most `prefetch` batches while the
+    calling thread runs the model, so reading and parsing overlap with
+    inference without buffering the whole file. `gate` (the NLP ToolGate)
+    is held per batch, which lets interactive NLP requests interleave
+    with a long job. A job can be run again after it finishes or is
+    cancelled, but only one run at a time; cancel() stops the run in progress.
+    """
+
+    TASK_LABELS = {"sentiment": "Sentiment", "ner": "Named entities", "translate": "Translate to French"}
+
+    def __init__(self, nlp_tool, task, batch_size, prefetch=4, gate=None):
+        if task not in nlp_tool.BATCH_TASKS:
+            raise ValueError(f"Unknown task '{task}'; choose one of: {', '.join(nlp_tool.BATCH_TASKS)}")
+        self.nlp_tool = nlp_tool
+        self.task = task
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.gate = gate
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _produce(self, stream, fmt, text_field, batches, progress):
+        batch = []
+        try:
+            for item in read_records(stream, fmt, text_field):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    progress.bytes_read = _position(stream)
+                    if not self._put(batches, batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(batches, batch)
+            self._put(batches, _END)
+        except Exception as e:
+            self._put(batches, e)
+
+    def _put(self, batches, item):
+        while not self._cancel.is_set():
+            try:
+                batches.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self, stream, fmt, output_path, text_field=None, on_progress=None):
+        """Process every record; returns the final JobProgress. Output is CSV for CSV input, else JSONL."""
+        # Also set in `finally` to stop the reader, so clear it for this run
+        self._cancel.clear()
+        progress = JobProgress(_size(stream))
+        batches = queue.Queue(maxsize=self.prefetch)
+        reader = threading.Thread(
+            target=self._produce, args=(stream, fmt, text_field, batches, progress),
+            name="document-reader", daemon=True,
+        )
+        started = time.perf_counter()
+        reader.start()
+
+        writer = None
+        try:
+            with open(output_path, "w", encoding="utf-8", newline="") as out:
+                while not self._cancel.is_set():
+                    batch = batches.get()
+                    if batch is _END:
+                        break
+                    if isinstance(batch, Exception):
+                        raise batch
+                    results = self._run_batch([text for _, text in batch], progress)
+                    writer = self._write(out, fmt, writer, batch, results)
+                    out.flush()
+                    progress.records += len(batch)
+                    progress.batches += 1
+                    progress.elapsed = time.perf_counter() - started
+                    if on_progress:
+                        on_progress(progress)
+        finally:
+            self._cancel.set()
+            reader.join(timeout=1.0)
+            progress.elapsed = time.perf_counter() - started
+            progress.done = True
+        if on_progress:
+            on_progress(progress)
+        return progress
+
+    def _run_batch(self, texts, progress):
+        # Blank records are passed through with an empty result instead of going to the model
+        positions = [i for i, text in enumerate(texts) if text]
+        results = [None] * len(texts)
+        if not positions:
+            return results
+        try:
+            with self.gate if self.gate is not None else nullcontext():
+                outputs = self.nlp_tool.run_batch(self.task, [texts[i] for i in positions])
+        except Exception as e:
+            print(f"❌ Batch of {len(positions)} records failed: {e}")
+            progress.failed += len(positions)
+            outputs = [{"error": str(e)}] * len(positions)
+        for i, output in zip(positions, outputs):
+            results[i] = output
+        return results
+
+    def _write(self, out, fmt, writer, batch, results):
+        if fmt == "csv":
+            for (record, _), result in zip(batch, results):
+                row = dict(record)
+                row.update(_flatten(self.task, result))
+                if writer is None:
+                    fields = [f for f in record if f is not None]
+                    fields += [c for c in RESULT_COLUMNS[self.task] + ["error"] if c not in fields]
+                    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+                    writer.writeheader()
+                writer.writerow(row)
+            return writer
+        for (record, _), result in zip(batch, results):
+            out.write(json.dumps({**record, self.task: result}, ensure_ascii=False) + "\n")
+        return writer
+
+
+def _position(stream):
+    try:
+        return stream.tell()
+    except (OSError, ValueError):
+        return 0
+
+
+def _size(stream):
+    try:
+        current = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(current)
+        return size
+    except (OSError, ValueError):
+        return None
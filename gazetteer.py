@@ -0,0 +1,321 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# City names that are also everyday words; only matched when they are the whole location
+COMMON_WORDS = {"nice", "split", "male", "bath", "cork", "reading", "mobile", "rio", "salem"}
+
+_MAX_WORDS = 6
+_MAX_LENGTH = 60
+_VALID_NAME = re.compile(r"^[^\W\d_]+(?:[\s.'’-]+[^\W\d_]+)*\.?$")
+
+
+def fold(text):
+    """Normalize a place name: strip accents, lowercase, drop punctuation, collapse spaces"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"['’]", "", text.lower())
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _max_typos(name):
+    if len(name) <= 4:
+        return 0
+    if len(name) <= 6:
+        return 1
+    if len(name) <= 12:
+        return 2
+    return 3
+
+
+class City:
+    __slots__ = ("name", "country", "country_name", "lat", "lon", "population")
+
+    def __init__(self, name, country, country_name, lat, lon, population):
+        self.name = name
+        self.country = country
+        self.country_name = country_name
+        self.lat = lat
+        self.lon = lon
+        self.population = population
+
+    @property
+    def key(self):
+        """Stable cache key, identical for every spelling/alias of this city"""
+        return f"{fold(self.name)}|{self.country.lower()}"
+
+    @property
+    def label(self):
+        return f"{self.name}, {self.country_name}"
+
+    @property
+    def query(self):
+        """Location string for the upstream weather service"""
+        return f"{self.name},{self.country_name}"
+
+    def __repr__(self):
+        return f"City({self.label!r})"
+
+
+class Resolution:
+    """Outcome of resolving a user-typed location"""
+
+    EXACT = "exact"
+    CORRECTED = "corrected"
+    AMBIGUOUS = "ambiguous"
+    UNKNOWN = "unknown"
+    REJECTED = "rejected"
+
+    __slots__ = ("status", "city", "text", "suggestions")
+
+    def __init__(self, status, text, city=None, suggestions=()):
+        self.status = status
+        self.text = text
+        self.city = city
+        self.suggestions = list(suggestions)
+
+
+class _TrieNode:
+    __slots__ = ("children", "cities")
+
+    def __init__(self):
+        self.children = {}
+        self.cities = None
+
+
+class Gazetteer:
+    """Bundled city index: prefix trie for exact/prefix lookups, trigram index for typo correction"""
+
+    def __init__(self, cities, countries):
+        self.cities = cities
+        self._root = _TrieNode()
+        self._grams = defaultdict(set)
+        self._countries = {}  # folded country name/alias -> code
+        for code, name, aliases in countries:
+            for alias in [name] + aliases:
+                self._countries[fold(alias)] = code
+        self._codes = {code for code, _, _ in countries}
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        countries = []
+        names = {}
+        for row in _read_tsv(os.path.join(data_dir, "countries.tsv")):
+            code, name = row[0], row[1]
+            aliases = [a for a in row[2].split("|") if a] if len(row) > 2 else []
+            countries.append((code, name, aliases))
+            names[code] = name
+
+        gazetteer = cls([], countries)
+        for row in _read_tsv(os.path.join(data_dir, "cities.tsv")):
+            name, aliases, country, lat, lon, population = row
+            city = City(name, country, names.get(country, country), float(lat), float(lon), int(population))
+            gazetteer.add(city, [a for a in aliases.split("|") if a])
+        return gazetteer
+
+    def add(self, city, aliases=()):
+        self.cities.append(city)
+        for spelling in [city.name] + list(aliases):
+            folded = fold(spelling)
+            if not folded:
+                continue
+            node = self._root
+            for ch in folded:
+                node = node.children.setdefault(ch, _TrieNode())
+            if node.cities is None:
+                node.cities = []
+                for gram in _trigrams(folded):
+                    self._grams[gram].add(folded)
+            node.cities.append(city)
+
+    def _node(self, folded):
+        node = self._root
+        for ch in folded:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _matches(self, folded):
+        node = self._node(folded)
+        return node.cities if node is not None and node.cities else []
+
+    @staticmethod
+    def _best(cities, country=None):
+        if country:
+            in_country = [c for c in cities if c.country == country]
+            cities = in_country or cities
+        return max(cities, key=lambda c: c.population) if cities else None
+
+    def lookup(self, name, country=None):
+        """Exact (alias- and accent-insensitive) lookup; ambiguous names resolve to the country hint or the largest city"""
+        return self._best(self._matches(fold(name)), country)
+
+    def complete(self, prefix, limit=5):
+        """Cities whose name or alias starts with prefix, largest first"""
+        node = self._node(fold(prefix))
+        if node is None:
+            return []
+        found = {}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for city in current.cities or ():
+                found[id(city)] = city
+            stack.extend(current.children.values())
+        return sorted(found.values(), key=lambda c: -c.population)[:limit]
+
+    def suggest(self, name, limit=3, max_typos=None):
+        """Closest known spellings by trigram overlap, re-ranked by edit distance: [(City, distance)]"""
+        folded = fold(name)
+        if not folded:
+            return []
+        max_typos = _max_typos(folded) if max_typos is None else max_typos
+        grams = _trigrams(folded)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                overlap[candidate] += 1
+        # q-gram count filter: each edit destroys at most 3 trigrams, so weaker overlaps cannot be in reach
+        min_overlap = len(grams) - 3 * max_typos
+        shortlist = sorted(
+            (c for c, shared in overlap.items()
+             if shared >= min_overlap and abs(len(c) - len(folded)) <= max_typos),
+            key=lambda c: -overlap[c],
+        )[:10]
+
+        scored = []
+        for candidate in shortlist:
+            distance = edit_distance(folded, candidate, max_typos)
+            if distance <= max_typos:
+                city = self._best(self._matches(candidate))
+                scored.append((distance, -city.population, city))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        seen = set()
+        results = []
+        for distance, _, city in scored:
+            if id(city) not in seen:
+                seen.add(id(city))
+                results.append((city, distance))
+        return results[:limit]
+
+    def split_country(self, text):
+        """Split 'london, canada' / 'hyderabad pakistan' / 'paris, us' into (city text, country code)"""
+        if "," in text:
+            head, _, tail = text.rpartition(",")
+            folded_tail = fold(tail)
+            if folded_tail.upper() in self._codes:
+                return head, folded_tail.upper()
+            if folded_tail in self._countries:
+                return head, self._countries[folded_tail]
+        words = fold(text).split()
+        # Longest trailing country name first ("united states", "sri lanka")
+        for size in range(min(4, len(words) - 1), 0, -1):
+            tail = " ".join(words[-size:])
+            if tail in self._countries and not self._matches(" ".join(words)):
+                return " ".join(words[:-size]), self._countries[tail]
+        return text, None
+
+    def resolve(self, text):
+        """Resolve a user-typed location to a City, correcting typos locally.
+
+        A name one edit away from exactly one bundled city is corrected; one
+        close to several (or further off) comes back AMBIGUOUS with
+        suggestions, so no upstream call is spent on a likely typo. Only
+        names with no bundled city nearby are UNKNOWN and worth asking the
+        weather service about.
+        """
+        text = text.strip()
+        if not 2 <= len(text) <= _MAX_LENGTH or len(text.split()) > _MAX_WORDS:
+            return Resolution(Resolution.REJECTED, text)
+
+        name, country = self.split_country(text)
+        plausible = _plausible(text)
+        if plausible:
+            city = self.lookup(name, country)
+            if city is not None:
+                return Resolution(Resolution.EXACT, text, city)
+
+        suggestions = self.suggest(name)
+        near = [c for c, distance in suggestions if distance <= 1]
+        if country:
+            near = [c for c in near if c.country == country] or near
+        if len(near) == 1:
+            return Resolution(Resolution.CORRECTED, text, near[0], [c for c, _ in suggestions])
+        if suggestions:
+            status = Resolution.AMBIGUOUS if plausible else Resolution.REJECTED
+            return Resolution(status, text, suggestions=[c for c, _ in suggestions])
+        if not plausible:
+            return Resolution(Resolution.REJECTED, text)
+
+        loose = self.suggest(name, max_typos=_max_typos(fold(name)) + 2)
+        return Resolution(Resolution.UNKNOWN, text, suggestions=[c for c, _ in loose])
+
+    def find_in_text(self, text):
+        """Find the longest known city name mentioned anywhere in free text"""
+        words = fold(text).split()
+        _, country = self.split_country(text)
+        for size in range(min(_MAX_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = " ".join(words[start:start + size])
+                if size == 1 and (len(phrase) < 3 or phrase in COMMON_WORDS):
+                    continue
+                matches = self._matches(phrase)
+                if matches:
+                    return self._best(matches, country)
+        return None
+
+
+def _plausible(text):
+    return 2 <= len(text) <= _MAX_LENGTH and len(text.split()) <= _MAX_WORDS and bool(
+        _VALID_NAME.match(text.replace(",", " ").strip())
+    )
+
+
+def _read_tsv(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                yield line.split("\t")
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Shared gazetteer loaded from the bundled data files on first use"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Gazetteer.load()
+        return _default
@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from collections import deque
+
+# Per-session memory cap: whichever limit is hit first spills the oldest turns to disk
+HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "40"))
+HISTORY_MAX_BYTES = int(os.getenv("CHAT_HISTORY_MAX_BYTES", str(256 * 1024)))
+HISTORY_DIR = os.getenv("CHAT_HISTORY_DIR", ".chat_history")
+
+# Compact encoding: one-letter role and kind codes instead of repeated dict keys
+_ROLES = {"user": "u", "ai": "a"}
+_ROLE_NAMES = {code: role for role, code in _ROLES.items()}
+_TEXT = "t"
+_JSON = "j"
+_ENTRY_OVERHEAD = 64
+
+
+def _encode(role, content):
+    if isinstance(content, str):
+        return _ROLES.get(role, "a"), _TEXT, content
+    return _ROLES.get(role, "a"), _JSON, json.dumps(content, separators=(",", ":"), default=str)
+
+
+def _decode(role, kind, text):
+    content = json.loads(text) if kind == _JSON else text
+    return {"role": _ROLE_NAMES.get(role, "ai"), "content": content}
+
+
+def _close_and_remove(state, path):
+    conn = state.get("conn")
+    if conn is not None:
+        conn.close()
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+class SessionHistory:
+    """Chat history that keeps a recent window in memory and spills older turns to SQLite"""
+
+    def __init__(self, session_id, window=HISTORY_WINDOW, max_bytes=HISTORY_MAX_BYTES, directory=HISTORY_DIR):
+        self.session_id = session_id
+        self.window = window
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, f"{session_id}.sqlite3")
+        self._recent = deque()  # (seq, role, kind, text)
+        self._recent_bytes = 0
+        self._spilled = 0
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._db_state = {"conn": None}
+        # The spill file only lives as long as the session
+        self._finalizer = weakref.finalize(self, _close_and_remove, self._db_state, self.path)
+
+    def _conn(self):
+        conn = self._db_state["conn"]
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "seq INTEGER PRIMARY KEY, role TEXT NOT NULL, kind TEXT NOT NULL, text TEXT NOT NULL)"
+            )
+            conn.execute("DELETE FROM messages")
+            self._db_state["conn"] = conn
+        return conn
+
+    def append(self, role, content):
+        """Add a message, spilling the oldest in-memory turns if over the cap"""
+        with self._lock:
+            entry = (self._next_seq,) + _encode(role, content)
+            self._next_seq += 1
+            self._recent.append(entry)
+            self._recent_bytes += len(entry[3]) + _ENTRY_OVERHEAD
+            self._spill_locked()
+
+    def _spill_locked(self):
+        spill = []
+        # Always keep the newest message in memory, even if it alone exceeds the byte cap
+        while len(self._recent) > 1 and (len(self._recent) > self.window or self._recent_bytes > self.max_bytes):
+            entry = self._recent.popleft()
+            self._recent_bytes -= len(entry[3]) + _ENTRY_OVERHEAD
+            spill.append(entry)
+        if spill:
+            conn = self._conn()
+            with conn:
+                conn.executemany("INSERT INTO messages (seq, role, kind, text) VALUES (?, ?, ?, ?)", spill)
+            self._spilled += len(spill)
+
+    def recent(self):
+        """Messages currently held in memory, oldest first"""
+        with self._lock:
+            return [_decode(role, kind, text) for _, role, kind, text in self._recent]
+
+    def older_count(self):
+        """Number of messages that have been spilled to disk"""
+        return self._spilled
+
+    def older(self, limit):
+        """Load the `limit` most recent spilled messages from disk, oldest first"""
+        with self._lock:
+            if not self._spilled or limit <= 0:
+                return []
+            rows = self._conn().execute(
+                "SELECT role, kind, text FROM messages ORDER BY seq DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_decode(*row) for row in reversed(rows)]
+
+    def iter_all(self):
+        """Yield every message in the session, streaming spilled ones from disk"""
+        with self._lock:
+            rows = []
+            if self._spilled:
+                rows = self._conn().execute("SELECT role, kind, text FROM messages ORDER BY seq").fetchall()
+            recent = list(self._recent)
+        for row in rows:
+            yield _decode(*row)
+        for _, role, kind, text in recent:
+            yield _decode(role, kind, text)
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._recent_bytes = 0
+            if self._spilled:
+                conn = self._conn()
+                with conn:
+                    conn.execute("DELETE FROM messages")
+            self._spilled = 0
+
+    def memory_bytes(self):
+        """Approximate size of the in-memory window"""
+        return self._recent_bytes
+
+    def __len__(self):
+        return self._spilled + len(self._recent)
@@ -0,0 +1,106 @@
+"""Hashed n-gram intent classifier for routing queries to tools.
+
+Features are word unigrams/bigrams, the first word and character trigrams,
+hashed into a fixed number of buckets, so the model is just one weight
+matrix. Train it offline with `python train_intents.py`; the result is
+bundled as data/intent_model.npz.
+"""
+import os
+import re
+import threading
+import zlib
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_MODEL_PATH = os.path.join(DATA_DIR, "intent_model.npz")
+DEFAULT_DIM = 1 << 12
+
+_TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[^\sa-z\d]")
+
+
+def tokenize(text):
+    """Lowercased words, numbers collapsed to '0', and single punctuation/operator characters"""
+    return ["0" if token[0].isdigit() else token for token in _TOKEN.findall(text.lower())]
+
+
+def features(text):
+    """Feature strings for one query (duplicates are meaningful: they count)"""
+    tokens = tokenize(text)
+    feats = [f"w:{token}" for token in tokens]
+    feats += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if tokens:
+        feats.append(f"f:{tokens[0]}")
+        if len(tokens) > 1:
+            feats.append(f"f2:{tokens[0]} {tokens[1]}")
+    for token in tokens[:24]:
+        if token.isalpha() and len(token) > 2:
+            padded = f"<{token}>"
+            feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return feats
+
+
+def hash_features(text, dim):
+    """{bucket: value} for a query; a second hash bit picks the sign to cancel collision bias"""
+    buckets = {}
+    for feat in features(text):
+        h = zlib.crc32(feat.encode("utf-8"))
+        index = h % dim
+        buckets[index] = buckets.get(index, 0.0) + (1.0 if (h >> 31) & 1 else -1.0)
+    norm = sum(v * v for v in buckets.values()) ** 0.5 or 1.0
+    return {index: value / norm for index, value in buckets.items()}
+
+
+class IntentClassifier:
+    """Linear softmax model over hashed features"""
+
+    def __init__(self, weights, bias, labels):
+        self.weights = weights  # (dim, len(labels))
+        self.bias = bias
+        self.labels = list(labels)
+        self.dim = weights.shape[0]
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+    def save(self, path):
+        import numpy as np
+
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    def probabilities(self, text):
+        import numpy as np
+
+        buckets = hash_features(text, self.dim)
+        scores = self.bias.copy()
+        if buckets:
+            indices = np.fromiter(buckets.keys(), dtype=np.intp, count=len(buckets))
+            values = np.fromiter(buckets.values(), dtype=self.weights.dtype, count=len(buckets))
+            scores += values @ self.weights[indices]
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, text):
+        """(label, confidence) for a query"""
+        probs = self.probabilities(text)
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_intent_classifier(path=DEFAULT_MODEL_PATH):
+    """Shared classifier loaded from the bundled model on first use; None if it cannot be loaded"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            try:
+                _default = IntentClassifier.load(path)
+            except (OSError, ImportError, KeyError, ValueError) as e:
+                print(f"⚠️ Intent classifier unavailable ({e}); routing with keyword rules only")
+                _default = False
+        return _default or None
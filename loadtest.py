@@ -0,0 +1,470 @@
+"""Offline load test for the multi-agent app.
+
+Starts a local fake server standing in for wttr.in and the Hugging Face
+inference API, swaps Gemini for a fake model object and the NLP pipelines
+for stubs, each with its own latency and error distribution, then drives
+N concurrent simulated chat sessions through MasterAgent and reports
+throughput, p50/p95/p99 latency per tool and process memory over time.
+
+    python loadtest.py --sessions 20 --duration 60
+    python loadtest.py --sessions 50 --requests 40 --wttr-ms 300 --wttr-errors 0.05 --json report.json
+    python loadtest.py --mix weather=5,chat=3,nlp=2 --respect-rate-limits
+
+Runs are reproducible for a given --seed (up to thread scheduling).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import unquote, urlparse
+
+# Smallest valid PNG (1x1, transparent), served as the "generated" image
+PNG_1X1 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6300010000000500010d0a2db40000000049454e44ae426082"
+)
+
+DEFAULT_MIX = "weather=30,chat=20,calculator=15,nlp=15,string=8,search=5,image=5,compound=2"
+
+# Replies that mean the request did not get a real answer
+ERROR_MARKERS = ("⏳", "❌", "⚠️", "Weather service error", "Routing error", "🤖 Gemini", "🤖 Chat Error",
+                 "🤖 API Quota", "🌤️ Weather Information (Demo Mode)")
+
+
+class Behaviour:
+    """Latency (log-normal around `median_ms`) and failure rate of one fake dependency"""
+
+    def __init__(self, median_ms, sigma=0.5, error_rate=0.0, seed=0):
+        self.median = median_ms / 1000.0
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """(delay seconds, fail?) for one call"""
+        with self._lock:
+            delay = self.median * math.exp(self.sigma * self._rng.gauss(0.0, 1.0)) if self.median else 0.0
+            return delay, self._rng.random() < self.error_rate
+
+    def wait(self, timeout=None):
+        """Sleep for one sampled latency (at most timeout); returns (timed out?, fail?)"""
+        delay, fail = self.sample()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            return True, fail
+        time.sleep(delay)
+        return False, fail
+
+
+# ---------------------------------------------------------------- fake upstream services
+
+def wttr_payload(city):
+    """A deterministic format=j1 response for a city"""
+    rng = random.Random(zlib.crc32(city.lower().encode("utf-8")))
+    descriptions = ["Sunny", "Partly cloudy", "Overcast", "Light rain", "Clear", "Patchy rain possible"]
+    base = rng.randint(5, 32)
+
+    def hour(h):
+        return {
+            "time": str(h * 300), "tempC": str(base + rng.randint(-4, 4)), "humidity": str(rng.randint(30, 95)),
+            "chanceofrain": str(rng.randint(0, 100)), "precipMM": f"{rng.random() * 3:.1f}",
+            "windspeedKmph": str(rng.randint(2, 40)), "weatherDesc": [{"value": rng.choice(descriptions)}],
+        }
+
+    temp_c = base + rng.randint(-2, 2)
+    return {
+        "current_condition": [{
+            "temp_C": str(temp_c), "temp_F": str(round(temp_c * 9 / 5 + 32)), "FeelsLikeC": str(temp_c + 1),
+            "FeelsLikeF": str(round((temp_c + 1) * 9 / 5 + 32)), "humidity": str(rng.randint(30, 95)),
+            "weatherDesc": [{"value": rng.choice(descriptions)}], "windspeedKmph": str(rng.randint(2, 40)),
+            "winddir16Point": rng.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"]),
+            "visibility": str(rng.randint(2, 10)), "pressure": str(rng.randint(995, 1025)),
+        }],
+        "nearest_area": [{"areaName": [{"value": city.split(",")[0]}], "country": [{"value": "Loadtestia"}]}],
+        "weather": [
+            {"date": f"2030-01-0{day + 1}", "maxtempC": str(base + 5), "mintempC": str(base - 5),
+             "avgtempC": str(base), "hourly": [hour(h) for h in range(8)]}
+            for day in range(3)
+        ],
+    }
+
+
+class FakeUpstreams:
+    """One local HTTP server answering like wttr.in (GET /<city>) and the HF inference API (POST /models/...)"""
+
+    def __init__(self, wttr, hf, port=0):
+        self.wttr = wttr
+        self.hf = hf
+        self.requests = defaultdict(int)
+        counts_lock = threading.Lock()
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _count(self, name):
+                with counts_lock:
+                    upstreams.requests[name] += 1
+
+            def _reply(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._count("wttr")
+                _, fail = upstreams.wttr.wait()
+                if fail:
+                    self._reply(503, b"Service Unavailable", "text/plain")
+                    return
+                city = unquote(urlparse(self.path).path.strip("/")).replace("+", " ")
+                self._reply(200, json.dumps(wttr_payload(city)).encode("utf-8"), "application/json")
+
+            def do_POST(self):
+                self._count("hf")
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                _, fail = upstreams.hf.wait()
+                if fail:
+                    self._reply(503, b'{"error": "Model is currently loading"}', "application/json")
+                    return
+                self._reply(200, PNG_1X1, "image/png")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel: same generate_content() call, simulated latency and failures"""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+
+    def generate_content(self, prompt, request_options=None):
+        timeout = (request_options or {}).get("timeout")
+        timed_out, fail = self.behaviour.wait(timeout)
+        if timed_out:
+            raise TimeoutError(f"Deadline of {timeout:.1f}s exceeded")
+        if fail:
+            raise RuntimeError("503 The model is overloaded. Please try again later.")
+        question = prompt.rsplit("User:", 1)[-1].split("Assistant:")[0].strip()
+        return SimpleNamespace(text=f"(fake Gemini) Here is a short answer about: {question[:80]}")
+
+
+class StubPipeline:
+    """Shape-compatible stand-in for a transformers pipeline: `base` latency per call plus `per_item_ms` per input"""
+
+    def __init__(self, task, behaviour, per_item_ms=0.0):
+        self.task = task
+        self.behaviour = behaviour
+        self.per_item = per_item_ms / 1000.0
+
+    def __call__(self, inputs, **kwargs):
+        batch = inputs if isinstance(inputs, list) else [inputs]
+        _, fail = self.behaviour.wait()
+        time.sleep(self.per_item * len(batch))
+        if fail:
+            raise RuntimeError(f"stub {self.task} pipeline failed")
+        results = [self._one(text) for text in batch]
+        if isinstance(inputs, list):
+            return results
+        return results[0] if self.task == "ner" else results
+
+    def _one(self, text):
+        if self.task == "summarization":
+            return {"summary_text": " ".join(text.split()[:12])}
+        if self.task == "sentiment-analysis":
+            positive = len(text) % 3 != 0
+            return {"label": "POSITIVE" if positive else "NEGATIVE", "score": 0.9}
+        if self.task.startswith("translation"):
+            return {"translation_text": f"[fr] {text}"}
+        if self.task == "ner":
+            return [{"entity_group": "MISC", "word": w, "score": 0.9} for w in re.findall(r"\b[A-Z][a-z]+\b", text)]
+        raise ValueError(f"No stub for task {self.task}")
+
+
+class StubTokenizer:
+    def tokenize(self, text, **kwargs):
+        return text.lower().split()
+
+
+def stub_loaders(behaviour, per_item_ms):
+    """NlpTool loaders returning stubs for every model in NLP_MODEL_SPECS"""
+    from tools import NLP_MODEL_SPECS
+
+    return {
+        name: (lambda task=task: StubTokenizer() if task is None else StubPipeline(task, behaviour, per_item_ms))
+        for name, (task, _, _) in NLP_MODEL_SPECS.items()
+    }
+
+
+# ---------------------------------------------------------------- workload
+
+TOPICS = ["black holes", "sourdough bread", "the roman empire", "electric cars", "jazz", "volcanoes", "chess"]
+SCENES = ["a lighthouse at dawn", "a cat astronaut", "a rainy street in tokyo", "a mountain cabin", "a robot chef"]
+TEXTS = [
+    "The new phone has a brilliant screen but the battery life is disappointing and it gets warm quickly.",
+    "Maria Lopez opened a bakery in Lisbon last spring. Customers from Porto and Madrid now visit every weekend.",
+    "The committee met on Tuesday to review the budget. Several members asked for more detail on transport costs. "
+    "A final vote is expected next month after a public consultation.",
+]
+
+
+def build_queries(rng, cities):
+    """tool name -> zero-argument query generator"""
+    return {
+        "weather": lambda: rng.choice([
+            f"weather in {rng.choice(cities)}", f"forecast for {rng.choice(cities)}",
+            f"will it rain in {rng.choice(cities)} tomorrow", "humidity trend this evening",
+        ]),
+        "chat": lambda: rng.choice([
+            f"tell me something interesting about {rng.choice(TOPICS)}", "how are you today?",
+            f"explain {rng.choice(TOPICS)} in simple words",
+        ]),
+        "calculator": lambda: f"calculate {rng.randint(2, 999)}*{rng.randint(2, 99)}",
+        "nlp": lambda: rng.choice([
+            f"sentiment: {rng.choice(TEXTS)}", f"summarize: {rng.choice(TEXTS)}",
+            f"translate: {rng.choice(TEXTS)}", f"extract entities: {rng.choice(TEXTS)}",
+        ]),
+        "string": lambda: f"reverse '{rng.choice(TOPICS)}'",
+        "search": lambda: f"search for {rng.choice(TOPICS)}",
+        "image": lambda: f"generate image of {rng.choice(SCENES)}",
+        "compound": lambda: f"weather in {rng.choice(cities)} and calculate {rng.randint(2, 99)}*{rng.randint(2, 99)}",
+    }
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Latencies and failures per handling agent, plus a memory timeline"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.timeline = []
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def record(self, agent, seconds, ok):
+        with self._lock:
+            self.latencies[agent].append(seconds)
+            self.completed += 1
+            if not ok:
+                self.errors[agent] += 1
+
+    def sample_memory(self, started):
+        from residency import process_rss_bytes
+
+        rss = process_rss_bytes()
+        with self._lock:
+            self.timeline.append({
+                "t": round(time.monotonic() - started, 1),
+                "rss_mb": round(rss / 2**20, 1) if rss is not None else None,
+                "threads": threading.active_count(),
+                "completed": self.completed,
+            })
+
+
+def is_error(response):
+    if isinstance(response, dict):
+        return response.get("type") == "error"
+    # Compound answers hold one section per part, so look at every line
+    return any(line.lstrip().startswith(ERROR_MARKERS) for line in str(response).splitlines())
+
+
+def run_session(agent, index, args, mix, cities, recorder, stop_at):
+    rng = random.Random(args.seed * 100003 + index)
+    queries = build_queries(rng, cities)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    context = {"session_id": f"load-{index}"}
+    sent = 0
+    while time.monotonic() < stop_at and (args.requests is None or sent < args.requests):
+        query = queries[rng.choices(names, weights)[0]]()
+        started = time.perf_counter()
+        try:
+            result = agent.dispatch(query, context)
+            response = str(result.response) if hasattr(result.response, "read") else result.response
+            ok = result.agent is not None and not is_error(response)
+            agent_name = result.agent or "error"
+        except Exception:
+            ok, agent_name = False, "error"
+        recorder.record(agent_name, time.perf_counter() - started, ok)
+        sent += 1
+        if args.think_ms:
+            time.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+
+def build_agent(args):
+    """A MasterAgent wired to the fakes; env must be set before tools is imported"""
+    from agents import MasterAgent
+    from tools import ChatTool, NlpTool
+    from gazetteer import get_gazetteer
+
+    chat = ChatTool()
+    chat.model = FakeGeminiModel(Behaviour(args.gemini_ms, args.sigma, args.gemini_errors, args.seed + 1))
+    nlp = NlpTool(model_server=None, loaders=stub_loaders(
+        Behaviour(args.nlp_ms, args.sigma, args.nlp_errors, args.seed + 2), args.nlp_item_ms
+    ))
+    agent = MasterAgent(tools={"chat": chat, "nlp": nlp})
+    cities = [c.name for c in sorted(get_gazetteer().cities, key=lambda c: -c.population)[:args.cities]]
+    return agent, cities
+
+
+def configure_environment(args, upstreams):
+    os.environ["WTTR_URL"] = upstreams.url
+    os.environ["HF_API_BASE"] = upstreams.url
+    os.environ["HF_API_KEY"] = "loadtest"
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["NLP_MODEL_SERVER"] = ""
+    os.environ["NLP_ARTIFACT_DIR"] = ""
+    if not args.respect_rate_limits:
+        for name in ("GEMINI", "HF_IMAGE", "WTTR"):
+            os.environ[f"{name}_RATE_PER_MIN"] = "1e9"
+            os.environ[f"{name}_SESSION_RATE_PER_MIN"] = "1e9"
+
+
+def report(recorder, elapsed, upstreams, agent):
+    from ratelimit import limiter_states
+
+    total = sum(len(v) for v in recorder.latencies.values())
+    rows = []
+    for name in sorted(recorder.latencies, key=lambda n: -len(recorder.latencies[n])):
+        values = sorted(recorder.latencies[name])
+        rows.append({
+            "agent": name,
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1),
+        })
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "per_agent": rows,
+        "memory": recorder.timeline,
+        "upstream_requests": dict(upstreams.requests),
+        "gates": agent.gate_states(),
+        "limiters": {name: {k: v for k, v in state.items() if k != "per_minute"}
+                     for name, state in limiter_states().items()},
+    }
+
+
+def print_report(result):
+    print(f"\n📈 {result['requests']} requests in {result['elapsed_s']}s → {result['throughput_rps']} req/s")
+    print(f"{'agent':<36} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in result["per_agent"]:
+        print(f"{row['agent']:<36} {row['requests']:>8} {row['errors']:>7} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}")
+    print(f"\n🌐 Upstream requests: {result['upstream_requests']}")
+    print("\n🧠 Memory over time")
+    for point in result["memory"]:
+        print(f"  t={point['t']:>6}s  rss={point['rss_mb']} MB  threads={point['threads']}  done={point['completed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test driving simulated sessions through MasterAgent")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated chat sessions")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop each session after this many requests")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="mean pause between a session's requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="query mix as tool=weight,...")
+    parser.add_argument("--cities", type=int, default=40, help="distinct cities weather queries draw from")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of every fake latency")
+    parser.add_argument("--wttr-ms", type=float, default=150.0)
+    parser.add_argument("--wttr-errors", type=float, default=0.01)
+    parser.add_argument("--hf-ms", type=float, default=2000.0)
+    parser.add_argument("--hf-errors", type=float, default=0.05)
+    parser.add_argument("--gemini-ms", type=float, default=800.0)
+    parser.add_argument("--gemini-errors", type=float, default=0.02)
+    parser.add_argument("--nlp-ms", type=float, default=40.0, help="stub pipeline latency per call")
+    parser.add_argument("--nlp-item-ms", type=float, default=60.0, help="stub pipeline latency per input text")
+    parser.add_argument("--nlp-errors", type=float, default=0.0)
+    parser.add_argument("--respect-rate-limits", action="store_true", help="keep the client-side rate limits")
+    parser.add_argument("--sample-interval", type=float, default=2.0, help="seconds between memory samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        wttr=Behaviour(args.wttr_ms, args.sigma, args.wttr_errors, args.seed + 3),
+        hf=Behaviour(args.hf_ms, args.sigma, args.hf_errors, args.seed + 4),
+    ).start()
+    configure_environment(args, upstreams)
+    json_path = os.path.abspath(args.json) if args.json else None
+    # Generated images and other side files land in a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="loadtest-"))
+
+    agent, cities = build_agent(args)
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    print(f"🚀 {args.sessions} sessions for {args.duration:.0f}s against fakes at {upstreams.url} (mix {args.mix})")
+
+    started = time.monotonic()
+    stop_at = started + args.duration
+    sessions = [
+        threading.Thread(target=run_session, args=(agent, i, args, mix, cities, recorder, stop_at), daemon=True)
+        for i in range(args.sessions)
+    ]
+    for session in sessions:
+        session.start()
+
+    recorder.sample_memory(started)
+    while any(session.is_alive() for session in sessions):
+        for session in sessions:
+            session.join(timeout=args.sample_interval)
+            if session.is_alive():
+                break
+        recorder.sample_memory(started)
+    elapsed = time.monotonic() - started
+
+    result = report(recorder, elapsed, upstreams, agent)
+    upstreams.stop()
+    print_report(result)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Wrote {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Shared NLP model server.
+
+One process holds a single copy of every NlpTool model and serves all
+frontends over a Unix socket, batching concurrent requests per model:
+
+    python model_server.py --socket /tmp/nlp-models.sock --workers 4
+
+Frontends opt in with NLP_MODEL_SERVER=/tmp/nlp-models.sock, which turns
+NlpTool into a thin client. The socket is owner-only (0600), so frontends
+must run as the same user as the server.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+def _to_builtin(value):
+    # numpy scalars in pipeline outputs (e.g. NER scores)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def send_frame(sock, payload):
+    data = json.dumps(payload, default=_to_builtin).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f"frame too large ({size} bytes)")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+class ModelServerError(Exception):
+    """Raised on the client when the server reports a failure"""
+
+
+# ---------------------------------------------------------------- server side
+
+class RequestBatcher:
+    """Group concurrent requests for the same model call into batches.
+
+    Requests are keyed by (model, method, kwargs); a collector thread waits
+    up to `max_wait` for more requests with the same key, then hands batches
+    of at most `max_batch` inputs to a pool of `workers` threads.
+    """
+
+    def __init__(self, models, workers=2, max_batch=8, max_wait=0.01):
+        self.models = models
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-worker")
+        threading.Thread(target=self._collect, name="batch-collector", daemon=True).start()
+
+    def submit(self, model, method, inputs, kwargs):
+        future = Future()
+        key = (model, method, json.dumps(kwargs, sort_keys=True))
+        self._queue.put((key, inputs, future))
+        return future
+
+    def _collect(self):
+        while True:
+            groups = {}
+            key, inputs, future = self._queue.get()
+            groups.setdefault(key, []).append((inputs, future))
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    key, inputs, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                groups.setdefault(key, []).append((inputs, future))
+
+            for key, items in groups.items():
+                for start in range(0, len(items), self.max_batch):
+                    self._pool.submit(self._run_batch, key, items[start:start + self.max_batch])
+
+    def _run_batch(self, key, items):
+        model_name, method, kwargs_json = key
+        kwargs = json.loads(kwargs_json)
+        inputs = [inputs for inputs, _ in items]
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(items)
+        try:
+            model = self.models.get(model_name)
+            if method == "tokenize":
+                results = [model.tokenize(text, **kwargs) for text in inputs]
+            else:
+                results = model(inputs, batch_size=len(inputs), **kwargs)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0,
+            "queued": self._queue.qsize(),
+        }
+
+
+class _ModelRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                if request.get("op") == "stats":
+                    response = {"ok": True, "result": server.stats()}
+                else:
+                    response = {"ok": True, "result": self._run(request)}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                send_frame(self.request, response)
+            except OSError:
+                return
+
+    def _run(self, request):
+        server = self.server
+        method = request.get("method", "__call__")
+        kwargs = request.get("kwargs", {})
+        inputs = request["inputs"]
+        items = inputs if request.get("batch") else [inputs]
+        futures = [server.batcher.submit(request["model"], method, item, kwargs) for item in items]
+        # Per-item results have the shape a list call returns
+        results = [future.result(timeout=server.request_timeout) for future in futures]
+        if request.get("batch"):
+            return results
+        # A single input returns what the local pipeline returns for a single input
+        result = results[0]
+        return [result] if isinstance(result, dict) else result
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, nlp_tool, workers=2, max_batch=8, max_wait=0.01, request_timeout=120.0):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _ModelRequestHandler)
+        self.nlp_tool = nlp_tool
+        self.request_timeout = request_timeout
+        self.batcher = RequestBatcher(nlp_tool.models, workers, max_batch, max_wait)
+
+    def server_bind(self):
+        # Owner-only from the moment the socket file exists, so other local users cannot run inference
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+    def stats(self):
+        return {"batching": self.batcher.stats(), "models": self.nlp_tool.models.stats()}
+
+
+# ---------------------------------------------------------------- client side
+
+class ModelServerClient:
+    """Thread-safe client; each thread keeps its own connection to the server"""
+
+    def __init__(self, socket_path, timeout=130.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def request(self, payload):
+        # One reconnect covers a server restart between calls
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_frame(sock, payload)
+                response = recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                self._reset()
+                if attempt:
+                    raise
+        if not response.get("ok"):
+            raise ModelServerError(response.get("error", "unknown model server error"))
+        return response["result"]
+
+
+class RemotePipeline:
+    """Stand-in for a local pipeline/tokenizer that forwards calls to the model server"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def __call__(self, inputs, **kwargs):
+        # batch_size is the server's decision
+        kwargs.pop("batch_size", None)
+        return self.client.request({
+            "model": self.name, "inputs": inputs, "kwargs": kwargs, "batch": isinstance(inputs, list),
+        })
+
+    def tokenize(self, text, **kwargs):
+        return self.client.request({"model": self.name, "method": "tokenize", "inputs": text, "kwargs": kwargs})
+
+
+class RemoteModelSet:
+    """Same interface NlpTool uses on ModelResidencyManager, backed by the model server"""
+
+    def __init__(self, socket_path):
+        self.client = ModelServerClient(socket_path)
+
+    def get(self, name):
+        return RemotePipeline(self.client, name)
+
+    def is_resident(self, name):
+        # Residency and warm-up are the server's concern
+        return False
+
+    def has_headroom(self):
+        return True
+
+    def stats(self):
+        try:
+            models = self.client.request({"op": "stats"})["models"]
+        except Exception as e:
+            print(f"❌ Model server stats unavailable: {e}")
+            models = {"loads": 0, "evictions": 0, "hits": 0, "resident_bytes": 0,
+                      "budget_bytes": None, "process_rss_bytes": None, "models": {}}
+        return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared NLP model server")
+    parser.add_argument("--socket", default=os.getenv("NLP_MODEL_SOCKET", "/tmp/nlp-models.sock"))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("NLP_MODEL_WORKERS", "2")))
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    from tools import NlpTool
+    from warmup import ModelWarmer
+
+    # The server itself always loads models locally
+    nlp_tool = NlpTool(model_server=None)
+    ModelWarmer(nlp_tool.warmup_targets()).start()
+    server = ModelServer(args.socket, nlp_tool, args.workers, args.max_batch, args.max_wait_ms / 1000.0)
+    print(f"🧠 Model server listening on {args.socket} ({args.workers} workers, batch ≤ {args.max_batch})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
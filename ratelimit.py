@@ -0,0 +1,230 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class RateLimitedError(Exception):
+    """Raised when a call is shed because its upstream or session is over its rate"""
+
+    def __init__(self, name, retry_in, scope="upstream"):
+        what = "your session's" if scope == "session" else f"the '{name}'"
+        super().__init__(f"Over {what} request rate limit (retry in {math.ceil(retry_in)}s)")
+        self.name = name
+        self.retry_in = retry_in
+        self.scope = scope
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, reserve=0.0):
+        """Take one token if more than `reserve` would remain; otherwise seconds until one is free"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill_locked(now)
+            if self.tokens - reserve >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 + reserve - self.tokens) / self.rate
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1.0)
+
+    def block(self, seconds):
+        """Hand out nothing for `seconds` and start empty afterwards (upstream said 429)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+    def available(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return 0.0
+            self._refill_locked(now)
+            return self.tokens
+
+
+class UsageCounter:
+    """Per-minute allowed / queued / shed counts over the last `minutes` minutes"""
+
+    def __init__(self, minutes=60):
+        self._buckets = deque(maxlen=minutes)  # [minute, allowed, queued, shed]
+        self._lock = threading.Lock()
+
+    def record(self, field):
+        index = {"allowed": 1, "queued": 2, "shed": 3}[field]
+        minute = int(time.time() // 60)
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != minute:
+                self._buckets.append([minute, 0, 0, 0])
+            self._buckets[-1][index] += 1
+
+    def series(self):
+        with self._lock:
+            return [
+                {"minute": minute * 60, "allowed": allowed, "queued": queued, "shed": shed}
+                for minute, allowed, queued, shed in self._buckets
+            ]
+
+    def totals(self):
+        totals = {"allowed": 0, "queued": 0, "shed": 0}
+        for point in self.series():
+            for field in totals:
+                totals[field] += point[field]
+        return totals
+
+
+class RateLimiter:
+    """Client-side token buckets for one upstream: a shared one plus one per session.
+
+    Interactive calls wait at most `interactive_wait` seconds for a token
+    and are shed beyond that; batch calls may queue for `batch_wait`
+    seconds but never dip into the last `batch_reserve` fraction of the
+    shared bucket, and yield while interactive callers are waiting. A
+    session over its own rate is shed at once so one user cannot drain
+    the upstream quota.
+    """
+
+    def __init__(self, name, rate, burst, session_rate=None, session_burst=None,
+                 interactive_wait=2.0, batch_wait=30.0, batch_reserve=0.25, max_sessions=1024):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.session_rate = session_rate
+        self.session_burst = session_burst or burst
+        self.max_wait = {INTERACTIVE: interactive_wait, BATCH: batch_wait}
+        self.batch_reserve = batch_reserve * burst
+        self.max_sessions = max_sessions
+        self.usage = UsageCounter()
+        self._sessions = OrderedDict()
+        self._interactive_waiting = 0
+        self._lock = threading.Lock()
+
+    def _session_bucket(self, session):
+        if session is None or not self.session_rate:
+            return None
+        with self._lock:
+            bucket = self._sessions.get(session)
+            if bucket is None:
+                bucket = self._sessions[session] = TokenBucket(self.session_rate, self.session_burst)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session)
+            return bucket
+
+    def acquire_session(self, session):
+        """Take a token from one session's own bucket; raises RateLimitedError at once when it is over its rate.
+
+        Call this before joining a shared (single-flight) call, so each waiting
+        session is checked against its own budget rather than the leader's.
+        """
+        session_bucket = self._session_bucket(session)
+        if session_bucket is not None:
+            wait = session_bucket.take()
+            if wait:
+                self.usage.record("shed")
+                raise RateLimitedError(self.name, wait, scope="session")
+
+    def refund_session(self, session):
+        """Give back a session token whose call was never sent upstream"""
+        session_bucket = self._session_bucket(session)
+        if session_bucket is not None:
+            session_bucket.refund()
+
+    def acquire(self, session=None, priority=INTERACTIVE):
+        """Take a token for one call, waiting briefly if allowed; raises RateLimitedError when shed.
+
+        With `session` the session's bucket is checked too; pass None when
+        acquire_session() has already been called for this request.
+        """
+        self.acquire_session(session)
+        try:
+            self._acquire_shared(priority)
+        except RateLimitedError:
+            self.refund_session(session)
+            raise
+
+    def _acquire_shared(self, priority):
+        deadline = time.monotonic() + self.max_wait[priority]
+        interactive = priority == INTERACTIVE
+        queued = False
+        if interactive:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    yield_to_interactive = not interactive and self._interactive_waiting > 0
+                wait = 0.05 if yield_to_interactive else self.bucket.take(0.0 if interactive else self.batch_reserve)
+                if not wait:
+                    self.usage.record("allowed")
+                    return
+                if time.monotonic() + wait > deadline:
+                    self.usage.record("shed")
+                    raise RateLimitedError(self.name, wait)
+                if not queued:
+                    queued = True
+                    self.usage.record("queued")
+                time.sleep(min(wait, 0.25))
+        finally:
+            if interactive:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+    def backoff(self, seconds):
+        """The upstream throttled us: shed everything for `seconds` instead of hitting it again"""
+        print(f"🚦 {self.name} throttled upstream; pausing calls for {seconds:.0f}s")
+        self.bucket.block(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            sessions = len(self._sessions)
+        return {
+            "rate_per_min": round(self.bucket.rate * 60, 2),
+            "burst": self.bucket.burst,
+            "available": round(self.bucket.available(), 2),
+            "sessions": sessions,
+            **self.usage.totals(),
+            "per_minute": self.usage.series(),
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, **settings):
+    """Return the shared RateLimiter for name, creating it on first use"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(name, **settings)
+            _limiters[name] = limiter
+        return limiter
+
+
+def limiter_states():
+    """Snapshot of every registered limiter, for observability"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,135 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_model_bytes(obj):
+    """Parameter + buffer bytes of a pipeline or model (0 for objects without weights)"""
+    model = getattr(obj, "model", obj)
+    if not hasattr(model, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    if hasattr(model, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total
+
+
+def process_rss_bytes():
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelResidencyManager:
+    """Load models on demand and keep the resident set under a byte budget.
+
+    `loaders` maps a model name to a zero-argument callable that builds it.
+    Least-recently-used unpinned models are evicted when the budget is
+    exceeded; `budget_bytes=None` means no limit.
+    """
+
+    def __init__(self, loaders, budget_bytes=None, pinned=()):
+        self.loaders = dict(loaders)
+        self.budget_bytes = budget_bytes
+        self.pinned = set(pinned)
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+        self.load_seconds = {}  # name -> duration of the most recent load
+        self._resident = OrderedDict()  # name -> [model, size, last_used]
+        self._load_locks = {name: threading.Lock() for name in self.loaders}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the model, loading it (and evicting others) if needed"""
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is not None:
+                return self._touch_locked(name, entry)
+
+        # Load outside the main lock so other models stay usable meanwhile
+        with self._load_locks[name]:
+            with self._lock:
+                entry = self._resident.get(name)
+                if entry is not None:
+                    return self._touch_locked(name, entry)
+
+            print(f"📦 Loading model: {name}")
+            started = time.perf_counter()
+            model = self.loaders[name]()
+            load_seconds = time.perf_counter() - started
+            size = estimate_model_bytes(model)
+            print(f"✅ Loaded {name} in {load_seconds:.2f}s")
+
+            with self._lock:
+                self._resident[name] = [model, size, time.time()]
+                self.load_seconds[name] = load_seconds
+                self.loads += 1
+                evicted = self._evict_locked(keep=name)
+
+        if evicted:
+            print(f"♻️ Evicted models over budget: {', '.join(evicted)}")
+            gc.collect()
+        return model
+
+    def _touch_locked(self, name, entry):
+        self.hits += 1
+        entry[2] = time.time()
+        self._resident.move_to_end(name)
+        return entry[0]
+
+    def _evict_locked(self, keep):
+        evicted = []
+        if self.budget_bytes is None:
+            return evicted
+        for name in list(self._resident):
+            if self.resident_bytes() <= self.budget_bytes:
+                break
+            if name == keep or name in self.pinned:
+                continue
+            del self._resident[name]
+            self.evictions += 1
+            evicted.append(name)
+        return evicted
+
+    def is_resident(self, name):
+        with self._lock:
+            return name in self._resident
+
+    def has_headroom(self):
+        """True while the resident set is under budget"""
+        with self._lock:
+            return self.budget_bytes is None or self.resident_bytes() < self.budget_bytes
+
+    def pin(self, name):
+        with self._lock:
+            self.pinned.add(name)
+
+    def unpin(self, name):
+        with self._lock:
+            self.pinned.discard(name)
+
+    def resident_bytes(self):
+        return sum(entry[1] for entry in self._resident.values())
+
+    def stats(self):
+        with self._lock:
+            models = {
+                name: {"bytes": size, "last_used": last_used, "pinned": name in self.pinned}
+                for name, (_, size, last_used) in self._resident.items()
+            }
+            return {
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "resident_bytes": self.resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "process_rss_bytes": process_rss_bytes(),
+                "load_seconds": dict(self.load_seconds),
+                "models": models,
+            }
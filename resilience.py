@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the endpoint's breaker is open"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit for '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker for one endpoint"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go through right now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                # Cool-down elapsed, let a probe through
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self.half_open_calls += 1
+
+            return True
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.total_failures,
+                "successes": self.total_successes,
+                "rejected": self.rejected,
+            }
+
+
+class AdaptiveTimeout:
+    """Derive a timeout from recently observed latencies (p95 x multiplier, clamped)"""
+
+    def __init__(self, initial=5.0, minimum=1.0, maximum=15.0, multiplier=3.0, window=50):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def current(self):
+        p95 = self.percentile(95)
+        if p95 is None:
+            return self.initial
+        return min(self.maximum, max(self.minimum, p95 * self.multiplier))
+
+
+class RetryBudget:
+    """Allow retries only up to a fraction of recent first attempts"""
+
+    def __init__(self, ratio=0.2, min_retries_per_window=3, window=60.0):
+        self.ratio = ratio
+        self.min_retries = min_retries_per_window
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self):
+        """Consume one retry if the budget allows it"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            allowed = max(self.min_retries, int(len(self._requests) * self.ratio))
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+def jittered_backoff(attempt, base=0.2, cap=2.0):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ServiceEndpoint:
+    """Breaker + adaptive timeout + retry budget guarding one upstream endpoint"""
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0,
+                 initial_timeout=5.0, min_timeout=1.0, max_timeout=15.0,
+                 max_retries=1, retry_ratio=0.2):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.timeout = AdaptiveTimeout(initial_timeout, min_timeout, max_timeout)
+        self.retry_budget = RetryBudget(retry_ratio)
+        self.max_retries = max_retries
+        self.last_error = None
+
+    def call(self, fn, failure_if=None, retry_if=None):
+        """Run fn(timeout) under the breaker.
+
+        Exceptions, and results for which failure_if(result) is true, count as
+        failures. The last result or exception is returned/raised once retries
+        are exhausted. An exception for which retry_if(exc) is false (e.g. a
+        quota error) is raised at once, without a retry or a breaker failure.
+        Raises CircuitOpenError without calling fn when open.
+        """
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.name, self.breaker.retry_in())
+
+            started = time.monotonic()
+            try:
+                result = fn(self.timeout.current())
+            except Exception as e:
+                self.timeout.observe(time.monotonic() - started)
+                if retry_if is not None and not retry_if(e):
+                    self.last_error = str(e)
+                    raise
+                self.breaker.record_failure()
+                self.last_error = str(e)
+                if not self._should_retry(attempt):
+                    raise
+            else:
+                self.timeout.observe(time.monotonic() - started)
+                if failure_if is None or not failure_if(result):
+                    self.breaker.record_success()
+                    return result
+                self.breaker.record_failure()
+                self.last_error = f"bad result: {result!r}"[:200]
+                if not self._should_retry(attempt):
+                    return result
+
+            time.sleep(jittered_backoff(attempt))
+            attempt += 1
+
+    def _should_retry(self, attempt):
+        return attempt < self.max_retries and self.retry_budget.try_spend()
+
+    def snapshot(self):
+        state = self.breaker.snapshot()
+        p50 = self.timeout.percentile(50)
+        state.update({
+            "timeout": round(self.timeout.current(), 2),
+            "p50_latency": round(p50, 3) if p50 is not None else None,
+            "last_error": self.last_error,
+        })
+        return state
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name, **settings):
+    """Return the shared ServiceEndpoint for name, creating it on first use"""
+    with _endpoints_lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            endpoint = ServiceEndpoint(name, **settings)
+            _endpoints[name] = endpoint
+        return endpoint
+
+
+def endpoint_states():
+    """Snapshot of every registered endpoint, for observability"""
+    with _endpoints_lock:
+        endpoints = list(_endpoints.values())
+    return {endpoint.name: endpoint.snapshot() for endpoint in endpoints}
@@ -0,0 +1,78 @@
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result (or its exception). Nothing is
+    cached once the call finishes.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.calls += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight request {key!r}")
+        if call.error is not None:
+            # Each waiter raises its own copy, so threads never share one traceback
+            raise _copy_error(call.error) from call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._inflight)}
+
+
+def _copy_error(error):
+    """A new exception of the same type and state as error, built without re-running its __init__"""
+    cls = type(error)
+    try:
+        copy = cls.__new__(cls, *error.args)
+        copy.args = error.args
+        copy.__dict__.update(getattr(error, "__dict__", {}))
+    except Exception:
+        return RuntimeError(f"Shared in-flight request failed: {error!r}")
+    return copy
+
+
+def normalize_key(text):
+    """Case- and whitespace-insensitive key for a free-text request"""
+    return " ".join(text.lower().split())
@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+
+_END = object()
+
+
+class TextStream:
+    """Text produced incrementally on a background thread.
+
+    `produce(emit, cancelled)` runs on its own thread, calling `emit(chunk)`
+    for each piece of text and checking the `cancelled` event to stop early.
+    Iterate the stream for chunks as they arrive, or call read() for the
+    whole text. The chunks can be consumed only once.
+    """
+
+    def __init__(self, produce, prefix=""):
+        self.error = None
+        self._parts = [prefix] if prefix else []
+        self._pending = [prefix] if prefix else []
+        self._chunks = queue.Queue()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._exhausted = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, args=(produce,), name="text-stream", daemon=True).start()
+
+    def _run(self, produce):
+        try:
+            produce(self._chunks.put, self._cancelled)
+        except Exception as e:
+            print(f"❌ Streaming generation failed: {e}")
+            self.error = e
+        finally:
+            self._chunks.put(_END)
+            with self._lock:
+                self._finished.set()
+                callbacks, self._callbacks = self._callbacks, []
+            for callback in callbacks:
+                callback()
+
+    def _next(self, timeout=None):
+        """Next chunk, None once exhausted; raises queue.Empty on timeout"""
+        if self._pending:
+            return self._pending.pop(0)
+        if self._exhausted:
+            return None
+        chunk = self._chunks.get(timeout=timeout)
+        if chunk is _END:
+            self._exhausted = True
+            if self.error is not None:
+                chunk = f"\n⚠️ Generation error: {self.error}"
+            else:
+                return None
+        self._parts.append(chunk)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self._next()
+            if chunk is None:
+                return
+            yield chunk
+
+    def read(self, timeout=None):
+        """The full text; on timeout, cancel and return what has arrived so far"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while self._next(None if deadline is None else max(0.0, deadline - time.monotonic())) is not None:
+                pass
+        except queue.Empty:
+            self.cancel()
+            return self.text + " …"
+        return self.text
+
+    @property
+    def text(self):
+        """Everything received so far"""
+        return "".join(self._parts)
+
+    def cancel(self):
+        """Ask the producer to stop; a no-op once it has finished"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def done(self):
+        return self._finished.is_set()
+
+    def add_done_callback(self, callback):
+        """Call callback() once the producer thread ends (immediately if it already has)"""
+        with self._lock:
+            if not self._finished.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def __str__(self):
+        # Lets callers that expect plain text keep working; blocks until generation ends
+        return self.read()
@@ -0,0 +1,38 @@
+from agents import MasterAgent
+from decompose import split_intents
+from intent_classifier import get_intent_classifier
+
+# (query, expected [(tool key, text)]) with the bundled classifier and keyword rules
+CASES = [
+    ("will it rain today? what about tomorrow", [("weather", "will it rain today? what about tomorrow")]),
+    ("weather in Trinidad and Tobago", [("weather", "weather in Trinidad and Tobago")]),
+    ("What is machine learning? Also what is 2+2", [("chat", "What is machine learning"), ("calculator", "what is 2+2")]),
+    ("weather in Delhi and calculate 15*23", [("weather", "weather in Delhi"), ("calculator", "calculate 15*23")]),
+    ("summarize: rain and floods hit the city", [("nlp", "summarize: rain and floods hit the city")]),
+]
+
+
+def _router():
+    # Routing only: skip building the tools (and loading models) that __init__ would
+    router = MasterAgent.__new__(MasterAgent)
+    router.intents = get_intent_classifier()
+    return router
+
+
+def test_split_intents():
+    """Compound queries split per tool; follow-ups stay with the part they refer to"""
+    router = _router()
+    failures = 0
+    for query, expected in CASES:
+        intents = split_intents(query, router.select_tool, router.standalone_chat)
+        got = [(intent.key, intent.text) for intent in intents]
+        if got == expected:
+            print(f"✅ {query!r}")
+        else:
+            failures += 1
+            print(f"❌ {query!r}\n   expected {expected}\n   got      {got}")
+    assert failures == 0, f"{failures} compound queries split incorrectly"
+
+
+if __name__ == "__main__":
+    test_split_intents()
@@ -1,39 +1,276 @@
 import os
-import requests
+import sys
 import math
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import urllib.parse
-import google.generativeai as genai
 from dotenv import load_dotenv
-import base64
-from transformers import pipeline, AutoTokenizer
-import streamlit as st
+from resilience import CircuitOpenError, get_endpoint
+from ratelimit import BATCH, INTERACTIVE, RateLimitedError, get_limiter
+from residency import ModelResidencyManager
+from singleflight import SingleFlight, normalize_key
+from gazetteer import Resolution, get_gazetteer
+from weather_data import WeatherRecordCache, answer_weather_query, parse_wttr
+from weather_warmer import CacheRefresher, PopularityTracker
+from translation import SentenceTranslator
+from streaming import TextStream
+
+# Heavy dependencies (transformers/torch, google.generativeai, requests, streamlit)
+# are imported inside the tools that need them, so importing this module stays cheap
+# for processes that only use the lightweight tools. bench_imports.py guards this.
 
 # Load environment variables at the module level
 load_dotenv()
 
 
+def get_secret(name):
+    """Read a setting from the environment, falling back to Streamlit secrets when running under Streamlit"""
+    value = os.getenv(name)
+    if value:
+        return value
+    # Only consult st.secrets if the app already imported Streamlit; never import it here
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+    try:
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+
+
+def _per_minute(name, default):
+    return float(os.getenv(name, default)) / 60.0
+
+
+# Client-side request rates per upstream, shared and per chat session (env values are per minute)
+UPSTREAM_RATE_LIMITS = {
+    "gemini": {
+        "rate": _per_minute("GEMINI_RATE_PER_MIN", 15), "burst": 5,
+        "session_rate": _per_minute("GEMINI_SESSION_RATE_PER_MIN", 6), "session_burst": 3,
+    },
+    "hf-inference": {
+        "rate": _per_minute("HF_IMAGE_RATE_PER_MIN", 6), "burst": 2,
+        "session_rate": _per_minute("HF_IMAGE_SESSION_RATE_PER_MIN", 2), "session_burst": 1,
+    },
+    "wttr.in": {
+        "rate": _per_minute("WTTR_RATE_PER_MIN", 60), "burst": 10,
+        "session_rate": _per_minute("WTTR_SESSION_RATE_PER_MIN", 20), "session_burst": 5,
+    },
+}
+
+
+def _session(context):
+    return (context or {}).get("session_id")
+
+
+def _is_quota_error(error):
+    """Gemini quota / 429 errors: the upstream is throttling us, so retrying only adds load"""
+    message = str(error).lower()
+    return "quota" in message or "429" in message or "resource_exhausted" in message or "rate limit" in message
+
+
+def _retry_after(response, default):
+    try:
+        return float(response.headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# name -> (pipeline task, hub model id, pipeline kwargs); task None means a bare tokenizer
+NLP_MODEL_SPECS = {
+    "summarizer": ("summarization", "facebook/bart-large-cnn", {}),
+    "sentiment_analyzer": ("sentiment-analysis", "distilbert/distilbert-base-uncased-finetuned-sst-2-english", {}),
+    "translator": ("translation_en_to_fr", "Helsinki-NLP/opus-mt-en-fr", {}),
+    "ner": ("ner", "dslim/bert-base-NER", {"aggregation_strategy": "simple"}),
+    "tokenizer": (None, "bert-base-uncased", {}),
+}
+NLP_MODEL_NAMES = list(NLP_MODEL_SPECS)
+# Residency budget for the NLP models in MB of weights (unset = keep everything resident)
+NLP_MODEL_BUDGET_MB = os.getenv("NLP_MODEL_BUDGET_MB")
+
+
+def _model_names(name, default):
+    """Model names from a comma-separated env var; unknown names are skipped with a warning"""
+    names = _env_list(name, default)
+    unknown = [n for n in names if n not in NLP_MODEL_SPECS]
+    if unknown:
+        print(f"⚠️ Ignoring unknown model(s) in {name}: {', '.join(unknown)} (known: {', '.join(NLP_MODEL_NAMES)})")
+    return [n for n in names if n in NLP_MODEL_SPECS]
+
+
+NLP_PINNED_MODELS = _model_names("NLP_PINNED_MODELS", [])
+NLP_PRELOAD_MODELS = _model_names("NLP_PRELOAD_MODELS", NLP_MODEL_NAMES)
+
+
+# Unix socket of a shared model_server.py process; when set, NlpTool holds no models itself
+NLP_MODEL_SERVER = os.getenv("NLP_MODEL_SERVER")
+# Directory of exported safetensors artifacts (see artifacts.py); when set, models load offline
+NLP_ARTIFACT_DIR = os.getenv("NLP_ARTIFACT_DIR")
+# Texts per forward pass for bulk document jobs
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "16"))
+# Translated sentences kept in memory; repeated boilerplate is translated once
+NLP_TRANSLATION_CACHE = int(os.getenv("NLP_TRANSLATION_CACHE", "10000"))
+
+
+def _hub_loader(spec):
+    task, hub_id, kwargs = spec
+
+    def load():
+        from transformers import pipeline, AutoTokenizer
+        if task is None:
+            return AutoTokenizer.from_pretrained(hub_id)
+        return pipeline(task, model=hub_id, **kwargs)
+    return load
+
 
 class NlpTool:
-    def __init__(self):
+    # Tasks run_batch() supports for bulk document processing
+    BATCH_TASKS = ("sentiment", "ner", "translate")
+
+    def __init__(self, model_server=NLP_MODEL_SERVER, loaders=None):
+        """`loaders` (model name -> zero-argument builder) replaces the hub/artifact loaders, e.g. with stubs"""
+        # Sentence-level translation with a per-sentence cache, over whichever translator is in use
+        self.sentence_translator = SentenceTranslator(
+            lambda: self.translator, batch_size=NLP_BATCH_SIZE, cache_size=NLP_TRANSLATION_CACHE
+        )
+        if model_server:
+            from model_server import RemoteModelSet
+            print(f"🧠 Initializing NLP Tool as a client of the model server at {model_server}")
+            self.models = RemoteModelSet(model_server)
+            return
+
         print("🧠 Initializing NLP Tool with Hugging Face models...")
 
-        # Load Hugging Face pipelines
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        self.sentiment_analyzer = pipeline("sentiment-analysis")
-        self.translator = pipeline("translation_en_to_fr", model="Helsinki-NLP/opus-mt-en-fr")
-        self.ner = pipeline("ner", model="dslim/bert-base-NER", aggregation_strategy="simple")
-        self.tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
+        if loaders is not None:
+            loaders = dict(loaders)
+        elif NLP_ARTIFACT_DIR:
+            import artifacts
+            # Pinned local safetensors only; the hub is never contacted
+            artifacts.enable_offline_mode()
+            loaders = {
+                name: (lambda name=name, spec=spec: artifacts.load_artifact(NLP_ARTIFACT_DIR, name, spec))
+                for name, spec in NLP_MODEL_SPECS.items()
+            }
+        else:
+            loaders = {name: _hub_loader(spec) for name, spec in NLP_MODEL_SPECS.items()}
+
+        # Hugging Face pipelines are loaded on demand and evicted LRU-first when over budget
+        budget = int(float(NLP_MODEL_BUDGET_MB) * 1024 * 1024) if NLP_MODEL_BUDGET_MB else None
+        self.models = ModelResidencyManager(loaders, budget_bytes=budget, pinned=NLP_PINNED_MODELS)
+
+        # Pinned models first, then the rest of the preload list while the budget allows
+        for name in NLP_PINNED_MODELS + [n for n in NLP_PRELOAD_MODELS if n not in NLP_PINNED_MODELS]:
+            if name not in NLP_PINNED_MODELS and not self.models.has_headroom():
+                break
+            self.models.get(name)
 
         print("✅ NLP Tool ready!")
 
-    def handle_input(self, query: str):
+    @property
+    def summarizer(self):
+        return self.models.get("summarizer")
+
+    @property
+    def sentiment_analyzer(self):
+        return self.models.get("sentiment_analyzer")
+
+    @property
+    def translator(self):
+        return self.models.get("translator")
+
+    @property
+    def ner(self):
+        return self.models.get("ner")
+
+    @property
+    def tokenizer(self):
+        return self.models.get("tokenizer")
+
+    def warmup_targets(self):
+        """Representative calls that pay each pipeline's one-time first-call costs"""
+        sample = (
+            "The city council approved a new public transport plan on Monday. "
+            "The plan adds three bus routes and extends metro service hours, "
+            "and officials in Hyderabad expect it to cut commute times across the city."
+        )
+        targets = {
+            "summarizer": lambda: self.summarizer(sample, max_length=30, min_length=5, do_sample=False),
+            "sentiment_analyzer": lambda: self.sentiment_analyzer(sample),
+            "translator": lambda: self.translator(sample),
+            "ner": lambda: self.ner(sample),
+            "tokenizer": lambda: self.tokenizer.tokenize(sample),
+        }
+        # Only warm what is resident; warming would otherwise load evicted models back in
+        return {name: warm for name, warm in targets.items() if self.models.is_resident(name)}
+
+    def run_batch(self, task, texts, batch_size=NLP_BATCH_SIZE):
+        """One JSON-serializable result per text, computed in padded batches of batch_size"""
+        if task == "sentiment":
+            results = self.sentiment_analyzer(texts, batch_size=batch_size, truncation=True)
+            return [{"label": r["label"], "score": round(float(r["score"]), 4)} for r in results]
+        if task == "ner":
+            results = self.ner(texts, batch_size=batch_size)
+            return [
+                [{"entity": r["entity_group"], "word": r["word"], "score": round(float(r["score"]), 2)} for r in entities]
+                for entities in results
+            ]
+        if task == "translate":
+            return self.sentence_translator.translate(texts, batch_size)
+        raise ValueError(f"Unknown batch task '{task}'")
+
+    def stream_generate(self, text, prefix="", **generate_kwargs):
+        """Summarize-style generation as a TextStream that yields text while the model decodes"""
+        pipe = self.summarizer
+        if not hasattr(pipe, "model"):
+            # Model server pipelines only return finished output
+            return TextStream(lambda emit, cancelled: emit(pipe(text, **generate_kwargs)[0]["summary_text"]), prefix)
+
+        def produce(emit, cancelled):
+            import torch
+            from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+            class EmitStreamer(TextStreamer):
+                def on_finalized_text(self, chunk, stream_end=False):
+                    if chunk:
+                        emit(chunk)
+
+            class StopWhenCancelled(StoppingCriteria):
+                def __call__(self, input_ids, scores, **kwargs):
+                    return torch.full((input_ids.shape[0],), cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
+            inputs = pipe.tokenizer(text, return_tensors="pt", truncation=True).to(pipe.model.device)
+            with torch.no_grad():
+                # Streaming needs one hypothesis at a time, so beam search is off here
+                pipe.model.generate(
+                    **inputs,
+                    streamer=EmitStreamer(pipe.tokenizer, skip_prompt=True, skip_special_tokens=True),
+                    stopping_criteria=StoppingCriteriaList([StopWhenCancelled()]),
+                    num_beams=1,
+                    **generate_kwargs,
+                )
+
+        return TextStream(produce, prefix)
+
+    def handle_input(self, query: str, context=None):
         query_lower = query.lower()
+        # Callers that can render partial text (the chat UI) set context["stream"]
+        stream = bool((context or {}).get("stream"))
 
         try:
             if query_lower.startswith("summarize"):
                 text = query.replace("summarize", "", 1).strip()
+                if stream:
+                    return self.stream_generate(text, max_length=100, min_length=20, do_sample=False)
                 result = self.summarizer(text, max_length=100, min_length=20, do_sample=False)
                 return result[0]['summary_text']
 
@@ -44,8 +281,7 @@ class NlpTool:
 
             elif query_lower.startswith("translate"):
                 text = query.replace("translate", "", 1).strip()
-                result = self.translator(text)
-                return f"French Translation: {result[0]['translation_text']}"
+                return f"French Translation: {self.sentence_translator.translate([text])[0]}"
 
             elif query_lower.startswith("entities") or query_lower.startswith("extract"):
                 text = query.replace("entities", "", 1).replace("extract", "", 1).strip()
@@ -67,6 +303,8 @@ class NlpTool:
             elif query_lower.startswith("paraphrase") or query_lower.startswith("nlp"):
                 # For simplicity, reuse summarizer as paraphraser
                 text = query.replace("paraphrase", "", 1).replace("nlp", "", 1).strip()
+                if stream:
+                    return self.stream_generate(text, "Paraphrased: ", max_length=100, min_length=20, do_sample=True)
                 result = self.summarizer(text, max_length=100, min_length=20, do_sample=True)
                 return f"Paraphrased: {result[0]['summary_text']}"
 
@@ -82,19 +320,23 @@ class ChatTool:
     def __init__(self):
         self.name = "ChatTool"
         self.model = None
+        self.endpoint = get_endpoint("gemini", initial_timeout=20.0, min_timeout=5.0, max_timeout=45.0)
+        self.limiter = get_limiter("gemini", **UPSTREAM_RATE_LIMITS["gemini"])
         self._initialize_model()
         
     def _initialize_model(self):
         """Initialize the Gemini model"""
         try:
             # Get API key from environment
-            api_key = os.getenv("GEMINI_API_KEY", st.secrets.get("GEMINI_API_KEY"))
+            api_key = get_secret("GEMINI_API_KEY")
             
             if not api_key:
                 print("❌ GEMINI_API_KEY not found in environment variables")
                 self.model = None
                 return
             
+            import google.generativeai as genai
+
             # Configure Gemini
             genai.configure(api_key=api_key)
             
@@ -125,7 +367,7 @@ class ChatTool:
             print(f"❌ Failed to initialize Gemini: {e}")
             self.model = None
     
-    def handle_input(self, query):
+    def handle_input(self, query, context=None):
         """Handle general chat queries using Gemini"""
         try:
             if self.model is None:
@@ -153,14 +395,35 @@ Try: "weather in your_city" or "calculate 2+2" """
             User: {query}
             Assistant:"""
             
-            # Generate response using Gemini
-            response = self.model.generate_content(prompt)
+            # Generate response using Gemini (fails fast while over the rate limit or the breaker is open)
+            self.limiter.acquire(_session(context))
+            response = self.endpoint.call(
+                lambda timeout: self.model.generate_content(prompt, request_options={"timeout": timeout}),
+                # Quota errors are not transient; they go straight to the limiter backoff below
+                retry_if=lambda e: not _is_quota_error(e),
+            )
             
             if response and response.text:
                 return response.text.strip()
             else:
                 return "I'm having trouble generating a response right now. Could you try rephrasing your question?"
             
+        except RateLimitedError as e:
+            return f"""⏳ {e}
+
+Gemini has a limited request rate, so I'm not sending this one right now.
+
+**Other tools still work:**
+- Weather, Calculator, Search, String operations"""
+
+        except CircuitOpenError as e:
+            return f"""🤖 Gemini is temporarily unavailable
+
+Recent requests to Gemini kept failing, so I'm pausing calls for {e.retry_in:.0f}s.
+
+**Other tools still work:**
+- Weather, Calculator, Search, String operations"""
+
         except Exception as e:
             error_msg = str(e).lower()
             
@@ -179,7 +442,9 @@ The Gemini model is not available. This usually means:
 
 **I can still help with weather, calculations, and search!**"""
             
-            elif "quota" in error_msg or "limit" in error_msg or "429" in error_msg:
+            elif _is_quota_error(e):
+                # Stop sending until the quota window has had time to recover
+                self.limiter.backoff(60.0)
                 return """🤖 API Quota Exceeded
 
 Your Gemini API quota has been exceeded for today.
@@ -207,40 +472,107 @@ Your Gemini API quota has been exceeded for today.
 **Other features available:**
 - Weather, Calculator, Search, String operations"""
 
+# Upstream base URLs; overridable to point at a proxy or at loadtest.py's fake servers
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co").rstrip("/")
+WTTR_URL = os.getenv("WTTR_URL", "http://wttr.in").rstrip("/")
+
 HF_MODEL_URLS = [
-    "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2-1",
-    "https://api-inference.huggingface.co/models/CompVis/stable-diffusion-v1-4",
-    "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5",
-    "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+    f"{HF_API_BASE}/models/stabilityai/stable-diffusion-2-1",
+    f"{HF_API_BASE}/models/CompVis/stable-diffusion-v1-4",
+    f"{HF_API_BASE}/models/runwayml/stable-diffusion-v1-5",
+    f"{HF_API_BASE}/models/stabilityai/stable-diffusion-xl-base-1.0"
 ]
-HF_API_KEY = os.getenv("HF_API_KEY", st.secrets.get("HF_API_KEY"))
+# Longest a caller waits on an identical in-flight request before giving up
+IMAGE_FLIGHT_TIMEOUT = 120.0
+WEATHER_FLIGHT_TIMEOUT = 35.0
+
+# Reject cities missing from the bundled gazetteer instead of asking wttr.in about them
+WEATHER_GAZETTEER_STRICT = os.getenv("WEATHER_GAZETTEER_STRICT", "0") == "1"
+NOT_FOUND_CACHE_SIZE = 1024
+# Words that never name a place; a leftover made only of these means "no city given"
+NON_PLACE_WORDS = set("""
+    weather temperature temp climate forecast rain raining rainy humidity humid wind windy trend
+    sunny cloudy hot cold warm snow storm umbrella chance of any there
+    today tomorrow tonight morning afternoon evening night now later this next few days day after week
+    will it be is going to the what whats how hows do does i should need bring a in for at like outside
+""".split())
+# How long one wttr.in fetch keeps answering current-conditions and forecast questions
+WEATHER_RECORD_TTL = float(os.getenv("WEATHER_RECORD_TTL", "900"))
+# Background refresh of the most-asked cities ahead of expiry; top K of 0 disables it
+WEATHER_WARM_TOP_K = int(os.getenv("WEATHER_WARM_TOP_K", "10"))
+WEATHER_WARM_RATE = float(os.getenv("WEATHER_WARM_RATE", "0.5"))
+WEATHER_REFRESH_AHEAD = float(os.getenv("WEATHER_REFRESH_AHEAD", "120"))
+# Returned by WeatherTool._fetch_record when wttr.in does not know the location
+CITY_NOT_FOUND = object()
+
 
 class ImageGenerationTool:
     def __init__(self):
         self.name = "ImageGenerationTool"
+        self.api_key = get_secret("HF_API_KEY")
+        # Identical prompts submitted at the same time share one generation
+        self.flights = SingleFlight()
+        # One Hugging Face account quota covers every model URL
+        self.limiter = get_limiter("hf-inference", **UPSTREAM_RATE_LIMITS["hf-inference"])
         
-    def handle_input(self, prompt: str) -> dict:
-        if not HF_API_KEY:
+    def handle_input(self, prompt: str, context=None) -> dict:
+        if not self.api_key:
             return {"type": "error", "message": "❌ Missing Hugging Face API Key. Set HF_API_KEY in .env file"}
+
+        # Each session is checked against its own budget before sharing an identical in-flight prompt
+        session = _session(context)
+        try:
+            self.limiter.acquire_session(session)
+            return self.flights.do(normalize_key(prompt), lambda: self._generate(prompt), timeout=IMAGE_FLIGHT_TIMEOUT)
+        except RateLimitedError as e:
+            if e.scope != "session":
+                self.limiter.refund_session(session)
+            return {"type": "error", "message": f"⏳ {e}. Image generation is rate limited; please try again shortly."}
+        except TimeoutError:
+            return {"type": "error", "message": f"❌ Timed out generating image for prompt: {prompt}"}
+
+    def _generate(self, prompt):
+        import requests
+
+        # Shared account quota only; raises RateLimitedError for every caller waiting on this prompt
+        self.limiter.acquire()
     
-        headers = {"Authorization": f"Bearer {HF_API_KEY}"}
+        headers = {"Authorization": f"Bearer {self.api_key}"}
         payload = {"inputs": prompt}
         response = None
     
         for i, model_url in enumerate(HF_MODEL_URLS):
+            endpoint = get_endpoint(model_url, initial_timeout=60.0, min_timeout=10.0, max_timeout=60.0,
+                                    max_retries=0)
             try:
-                response = requests.post(model_url, headers=headers, json=payload, timeout=60)
+                response = endpoint.call(
+                    lambda timeout: requests.post(model_url, headers=headers, json=payload, timeout=timeout),
+                    failure_if=lambda r: r.status_code >= 500,
+                )
     
                 # ✅ Check if response is image
                 if response.status_code == 200 and "image" in response.headers.get("content-type", ""):
                     break
+                elif response.status_code == 429:
+                    # Throttled account-wide; the other model URLs share the same quota
+                    self.limiter.backoff(_retry_after(response, 30.0))
+                    break
                 elif response.status_code in [404, 503]:
                     continue
+            except CircuitOpenError as e:
+                print(f"⏭️ Skipping {model_url}: {e}")
+                continue
             except Exception as e:
                 print(f"❌ Exception with {model_url}: {e}")
                 continue
     
-        if response is None or response.status_code != 200 or "image" not in response.headers.get("content-type", ""):
+        if response is None:
+            return {
+                "type": "error",
+                "message": f"❌ Failed to generate image for prompt: {prompt}\nError: all image services are unavailable"
+            }
+
+        if response.status_code != 200 or "image" not in response.headers.get("content-type", ""):
             # Try to parse error
             try:
                 err = response.json()
@@ -269,87 +601,150 @@ class ImageGenerationTool:
 class WeatherTool:
     def __init__(self):
         self.name = "WeatherTool"
+        self.endpoint = get_endpoint("wttr.in", initial_timeout=5.0, min_timeout=2.0, max_timeout=15.0)
+        self.limiter = get_limiter("wttr.in", **UPSTREAM_RATE_LIMITS["wttr.in"])
+        self.flights = SingleFlight()
+        self.gazetteer = get_gazetteer()
+        # Names wttr.in has already answered 404 for, so they are rejected locally next time
+        self._not_found = OrderedDict()
+        self._not_found_lock = threading.Lock()
+        self.records = WeatherRecordCache(ttl=WEATHER_RECORD_TTL)
+        # Started by the app; keeps popular cities in memory so their queries never wait on wttr.in
+        self.popularity = PopularityTracker()
+        self.refresher = CacheRefresher(
+            self.popularity, self._refresh_record, self.records.expires_in,
+            top_k=WEATHER_WARM_TOP_K, refresh_ahead=min(WEATHER_REFRESH_AHEAD, WEATHER_RECORD_TTL / 2),
+            max_rate=WEATHER_WARM_RATE,
+        )
         print("🌤️ Weather tool initialized with free weather service")
         
-    def handle_input(self, query):
+    def handle_input(self, query, context=None):
         """Handle weather queries using free weather API"""
         try:
-            # Extract city from query
+            # Extract city from query; follow-ups without one reuse the session's last city
             city = self._extract_city(query)
-            print(f"🌍 Looking up weather for: {city}")
-            
-            # Get weather from free API
-            result = self._get_weather_free_api(city)
-            if result:
-                return result
+            if city is None:
+                city = (context or {}).get("weather_city") or "London"
+
+            # Resolve and spell-correct it locally before spending a network call
+            resolution = self.gazetteer.resolve(city)
+            note = ""
+            if resolution.city is not None:
+                if resolution.status == Resolution.CORRECTED:
+                    note = f"🔎 Showing results for {resolution.city.label} (you typed '{city}')\n"
+                location, key, city = resolution.city.query, resolution.city.key, resolution.city.label
+            elif resolution.status == Resolution.AMBIGUOUS:
+                # Close to bundled cities but not clearly one of them: ask rather than guess or fetch
+                return f"🔎 Did you mean: {', '.join(c.label for c in resolution.suggestions)}? Please ask again with the full name."
             else:
-                return self._get_demo_weather(city)
-                
+                # Only names with no bundled city nearby are worth asking wttr.in about
+                location, key = city, normalize_key(city)
+                if resolution.status == Resolution.REJECTED or WEATHER_GAZETTEER_STRICT or key in self._not_found:
+                    return self._city_not_found(city, resolution.suggestions)
+            print(f"🌍 Looking up weather for: {city}")
+
+            # Parsed records answer current conditions and follow-up questions alike
+            record = self._get_record(location, key, _session(context))
+            if record is CITY_NOT_FOUND:
+                return self._city_not_found(city, resolution.suggestions)
+            if record is None:
+                return note + self._get_demo_weather(city)
+
+            if context is not None:
+                context["weather_city"] = city
+            return note + answer_weather_query(record, query)
+
+        except RateLimitedError as e:
+            return f"⏳ {e}. Please try the weather again shortly."
         except Exception as e:
             return f"Weather service error: {str(e)}"
-    
-    def _get_weather_free_api(self, city):
-        """Get weather from free wttr.in API (no key required)"""
+
+    def _city_not_found(self, city, suggestions):
+        message = f"❌ City '{city}' not found. Please check the spelling and try again."
+        if suggestions:
+            message += "\nDid you mean: " + ", ".join(c.label for c in suggestions) + "?"
+        return message
+
+    def _remember_not_found(self, key):
+        with self._not_found_lock:
+            self._not_found[key] = True
+            while len(self._not_found) > NOT_FOUND_CACHE_SIZE:
+                self._not_found.popitem(last=False)
+
+    def _get_record(self, location, key, session=None):
+        """Cached WeatherRecord for a location, fetching at most once per key at a time"""
+        record = self.records.get(key)
+        self.popularity.record(key, location, hit=record is not None)
+        if record is not None:
+            return record
+        # Each session is checked against its own budget before sharing an in-flight fetch
+        self.limiter.acquire_session(session)
+        try:
+            return self.flights.do(key, lambda: self._fetch_record(location, key), timeout=WEATHER_FLIGHT_TIMEOUT)
+        except RateLimitedError:
+            self.limiter.refund_session(session)
+            raise
+        except TimeoutError as e:
+            print(f"❌ {e}")
+            return None
+
+    def _refresh_record(self, key, location):
+        """Background re-fetch for CacheRefresher; skips names wttr.in has rejected"""
+        if key in self._not_found:
+            return False
+        record = self.flights.do(
+            key, lambda: self._fetch_record(location, key, priority=BATCH), timeout=WEATHER_FLIGHT_TIMEOUT
+        )
+        return record is not None and record is not CITY_NOT_FOUND
+
+    def _fetch_record(self, city, key, priority=INTERACTIVE):
+        """Fetch and parse weather from free wttr.in API (no key required)"""
+        import requests
+
+        # Shared upstream budget only (callers check their session first); raises RateLimitedError when shed.
+        # Background refreshes are batch traffic and give way to user queries
+        self.limiter.acquire(priority=priority)
+
         try:
             # Clean city name
             city_clean = city.strip().replace(' ', '+')
-            url = f"http://wttr.in/{city_clean}?format=j1"
+            url = f"{WTTR_URL}/{city_clean}?format=j1"
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
             print(f"🌐 Requesting weather from wttr.in for {city}...")
-            response = requests.get(url, headers=headers, timeout=15)
+            response = self.endpoint.call(
+                lambda timeout: requests.get(url, headers=headers, timeout=timeout),
+                failure_if=lambda r: r.status_code >= 500,
+            )
             print(f"📡 API Response Status: {response.status_code}")
             
             if response.status_code == 200:
-                data = response.json()
-                
-                # Check if data is valid
-                if 'current_condition' not in data or not data['current_condition']:
+                # Parse the whole payload once (current conditions + 3-day hourly forecast)
+                record = parse_wttr(response.json(), city)
+                if record is None:
                     print("❌ Invalid response from weather API")
                     return None
-                
-                current = data['current_condition'][0]
-                nearest_area = data.get('nearest_area', [{}])[0]
-                
-                # Extract weather data
-                temp_c = current['temp_C']
-                temp_f = current['temp_F']
-                feels_like_c = current['FeelsLikeC']
-                feels_like_f = current['FeelsLikeF']
-                humidity = current['humidity']
-                description = current['weatherDesc'][0]['value']
-                wind_speed = current['windspeedKmph']
-                wind_dir = current['winddir16Point']
-                visibility = current['visibility']
-                pressure = current['pressure']
-                
-                # Get location info
-                area_name = nearest_area.get('areaName', [{'value': city}])[0]['value']
-                country = nearest_area.get('country', [{'value': ''}])[0]['value']
-                
+
                 print("✅ Weather data retrieved successfully!")
-                
-                return f"""🌤️ Current Weather Information:
-                    📍 Location: {area_name}{', ' + country if country else ''}
-                    🌡️ Temperature: {temp_c}°C ({temp_f}°F)
-                    🌡️ Feels Like: {feels_like_c}°C ({feels_like_f}°F)
-                    ☁️ Condition: {description}
-                    💨 Wind: {wind_speed} km/h {wind_dir}
-                    💧 Humidity: {humidity}%
-                    👁️ Visibility: {visibility} km
-                    🌪️ Pressure: {pressure} mb
-                    🕐 Updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-                    """
+                self.records.put(key, record)
+                return record
             
             elif response.status_code == 404:
-                return f"❌ City '{city}' not found. Please check the spelling and try again."
+                self._remember_not_found(key)
+                return CITY_NOT_FOUND
+            elif response.status_code == 429:
+                self.limiter.backoff(_retry_after(response, 60.0))
+                return None
             else:
                 print(f"❌ Weather API failed with status: {response.status_code}")
                 return None
             
+        except CircuitOpenError as e:
+            print(f"⏭️ {e}")
+            return None
         except requests.exceptions.Timeout:
             print("❌ Weather request timed out")
             return None
@@ -399,6 +794,11 @@ class WeatherTool:
     
     def _extract_city(self, query):
         """Extract city name from user query"""
+        # A known city mentioned anywhere in the query wins
+        known = self.gazetteer.find_in_text(query)
+        if known is not None:
+            return known.label
+
         query_lower = query.lower().strip()
         
         # Remove common weather query prefixes
@@ -417,10 +817,22 @@ class WeatherTool:
                 break
         
         # Remove trailing words
-        suffixes_to_remove = [" weather", " temperature", " temp", " climate", " today"]
+        suffixes_to_remove = [
+            " weather", " temperature", " temp", " climate", " today", " tomorrow", " tonight",
+            " this morning", " this afternoon", " this evening", " now"
+        ]
+        query_lower = query_lower.rstrip("?!. ")
         for suffix in suffixes_to_remove:
             if query_lower.endswith(suffix):
                 query_lower = query_lower[:-len(suffix)].strip()
+
+        # Long leftovers are usually a whole sentence; look for "in/for/at <city>" at the end
+        if len(query_lower.split()) > 3:
+            match = re.search(r".*\b(?:in|for|at)\s+([a-z\s]+?)(?:\s+(?:now|today|tomorrow))?\s*[?.!]*$", query_lower)
+            if match and len(match.group(1).strip()) > 2 and not self._names_no_place(match.group(1)):
+                return match.group(1).strip().title()
+            # A sentence with no place in it, e.g. a follow-up like "will it rain this evening"
+            return None
         
         # If nothing left or too short, try pattern matching
         if not query_lower or len(query_lower) < 2:
@@ -437,16 +849,22 @@ class WeatherTool:
                     if len(city) > 2:
                         return city.title()
             
-            # Default fallback
-            return "London"
-        
+            # No city given; the caller falls back to the session's last city or the default
+            return None
+
+        if self._names_no_place(query_lower):
+            return None
         return query_lower.title()
 
+    @staticmethod
+    def _names_no_place(text):
+        return all(word in NON_PLACE_WORDS for word in re.findall(r"[a-z']+", text.lower().replace("'", "")))
+
 class WebSearchTool:
     def __init__(self):
         self.name = "WebSearchTool"
         
-    def handle_input(self, query):
+    def handle_input(self, query, context=None):
         """Handle web search using simple approach (no dependencies)"""
         try:
             # Clean the search query
@@ -491,7 +909,7 @@ class CalculatorTool:
     def __init__(self):
         self.name = "CalculatorTool"
         
-    def handle_input(self, query):
+    def handle_input(self, query, context=None):
         """Handle mathematical calculations using basic operations"""
         try:
             # Clean the query
@@ -622,7 +1040,7 @@ class StringTool:
     def __init__(self):
         self.name = "StringTool"
         
-    def handle_input(self, query):
+    def handle_input(self, query, context=None):
         """Handle string operations"""
         try:
             query_lower = query.lower()
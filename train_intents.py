@@ -0,0 +1,222 @@
+"""Train the routing intent classifier offline and write data/intent_model.npz.
+
+    python train_intents.py                  # train, report holdout accuracy vs the keyword rules
+    python train_intents.py --out /tmp/m.npz --dim 8192
+
+Training examples come from the templates below plus hand-labelled queries
+in data/intents.tsv (label<TAB>query); add misrouted real queries there and
+retrain.
+"""
+import argparse
+import os
+import random
+import time
+
+from intent_classifier import DATA_DIR, DEFAULT_DIM, DEFAULT_MODEL_PATH, IntentClassifier, hash_features
+
+EXTRA_EXAMPLES = os.path.join(DATA_DIR, "intents.tsv")
+
+SLOTS = {
+    "city": ["Delhi", "Mumbai", "Hyderabad", "London", "Paris", "Tokyo", "New York", "Chennai", "Berlin",
+             "Sydney", "Bengaluru", "Dubai", "Toronto", "Singapore", "Kolkata", "Pune", "Moscow", "Cairo",
+             "san francisco", "lagos", "rome", "madrid", "seoul", "beijing", "jaipur", "warangal", "boston"],
+    "when": ["", "", "today", "tomorrow", "tonight", "this evening", "this weekend", "later", "now",
+             "in the morning", "next week", "on friday"],
+    "expr": ["15*23", "12 * 7", "100/4", "2^10", "(3+4)*2", "45 - 17", "3.5 * 2", "1000 / 8 + 3", "7*8*9",
+             "256 + 512", "99 - 33 * 2", "12 % 5", "2**8", "(10 - 4) / 3", "18 x 4", "5 plus 7", "9 times 6"],
+    "n": ["2", "3", "5", "7", "10", "12", "16", "20", "25", "42", "64", "100", "144", "1000"],
+    "topic": ["python tutorials", "climate change", "the eiffel tower", "quantum computing", "best laptops 2024",
+              "electric cars", "machine learning", "the french revolution", "healthy recipes", "world cup 2022",
+              "stock market news", "mars rover", "covid vaccines", "javascript frameworks", "top 10 movies",
+              "cheap flights to goa", "nobel prize winners", "rust programming", "bitcoin price", "ipl 2023 results"],
+    "person": ["elon musk", "sachin tendulkar", "marie curie", "the prime minister of india", "taylor swift",
+               "alan turing", "the ceo of google"],
+    "word": ["hello", "python", "streamlit", "racecar", "abc123", "openai", "weather", "rain", "level", "data"],
+    "phrase": ["hello world", "the quick brown fox", "Multi Agent Assistant", "good morning", "rain in spain",
+               "version 2 release", "I love coding", "room 101", "calculate this"],
+    "scene": ["a cat on a sofa", "a sunset over the ocean", "a futuristic city", "3 dogs playing in the snow",
+              "a dragon flying over mountains", "a cozy cabin in the rain", "an astronaut riding a horse",
+              "a bowl of ramen", "2 robots playing chess", "a stormy sky over a lighthouse", "a logo for my blog"],
+    "text": ["The weather was terrible and the train was 3 hours late.",
+             "Apple reported revenue of 90 billion dollars in the last quarter.",
+             "I absolutely loved the movie, the acting was brilliant!",
+             "Barack Obama visited Paris in 2015 to meet Emmanuel Macron.",
+             "The service at this restaurant was slow and the food was cold.",
+             "Heavy rain and strong wind caused flooding in Mumbai yesterday.",
+             "Please calculate the total cost before sending the invoice.",
+             "Google announced a new search feature at its conference in California.",
+             "How are you doing today?",
+             "Generate more leads by improving the landing page.",
+             "The temperature in the lab must stay below 20 degrees."],
+    "lang": ["french", "german", "spanish", "hindi", "telugu"],
+    "concept": ["recursion", "quantum computing", "photosynthesis", "black holes", "the stock market",
+                "how a train works", "how the brain stores memories", "cosine similarity", "a window function in sql",
+                "the cost of living", "how logging works", "blockchain", "the theory of relativity", "inflation"],
+    "task": ["my resume", "a job interview", "learning guitar", "writing a blog", "training for a marathon",
+             "saving money", "planning a trip", "studying for exams", "cooking dinner"],
+}
+
+TEMPLATES = {
+    "weather": [
+        "weather in {city}", "what's the weather like in {city} {when}", "temperature in {city}",
+        "forecast for {city}", "will it rain in {city} {when}", "is it going to rain {when}",
+        "how hot is it in {city}", "do I need an umbrella {when}", "humidity in {city} {when}",
+        "how windy is it in {city}", "is it sunny in {city} {when}", "what's the temperature {when}",
+        "weather {when}", "{city} weather", "3 day forecast for {city}", "will it snow in {city} {when}",
+        "how cold will it be {when} in {city}", "weather in {city} for the next {n} days",
+        "is it raining in {city}", "should I carry a jacket in {city} {when}", "climate in {city}",
+    ],
+    "calculator": [
+        "calculate {expr}", "what is {expr}", "{expr}", "solve {expr}", "what's {expr}", "compute {expr}",
+        "square root of {n}", "sqrt({n})", "factorial of {n}", "{n} factorial", "sin({n})", "log {n}",
+        "{n} to the power of {n}", "how much is {expr}", "what is {n} percent of {n}", "evaluate {expr}",
+        "cos {n}", "tan({n})", "{expr} = ?", "solve the equation x + {n} = {n}",
+    ],
+    "search": [
+        "search for {topic}", "find information about {topic}", "look up {topic}", "google {topic}",
+        "search {topic}", "find {topic}", "who is {person}", "lookup {topic}", "find the latest news on {topic}",
+        "search the web for {topic}", "duckduckgo {topic}", "search for {person}",
+    ],
+    "string": [
+        "reverse '{word}'", "uppercase '{phrase}'", "make uppercase {phrase}", "lowercase '{phrase}'",
+        "make lowercase {phrase}", "length of '{phrase}'", "count characters in '{phrase}'", "capitalize '{phrase}'",
+        "replace '{word}' with 'world' in '{phrase}'", "reverse string {word}", "string length of {phrase}",
+        "count words in '{phrase}'", "reverse {word}", "count vowels in '{phrase}'",
+    ],
+    "image": [
+        "generate image of {scene}", "create an image of {scene}", "draw a picture of {scene}",
+        "make a picture of {scene}", "generate a picture of {scene}", "draw {scene}", "create image {scene}",
+        "generate {scene}", "create art of {scene}", "make an illustration of {scene}", "paint {scene}",
+    ],
+    "nlp": [
+        "summarize: {text}", "summarize {text}", "sentiment: {text}", "sentiment {text}", "translate: {text}",
+        "translate to {lang}: {text}", "extract entities: {text}", "entities: {text}", "keywords: {text}",
+        "tokenize: {text}", "paraphrase: {text}", "nlp: {text}", "extract keywords from {text}",
+        "translate {text}", "paraphrase {text}",
+    ],
+    "chat": [
+        "hello", "hi there", "how are you", "tell me a joke", "explain {concept}", "what is {concept}",
+        "why is the sky blue", "who are you", "thanks", "can you help me with {task}",
+        "write a poem about {topic}", "give me tips for {task}", "what do you think about {concept}",
+        "tell me {n} facts about {concept}", "recommend {n} books about {concept}", "give me {n} ideas for {task}",
+        "how do I learn {concept}", "I have {n} hours, how should I spend them on {task}",
+        "good morning", "what can you do", "explain {concept} like I'm {n}", "write a story about {scene}",
+        "help me plan {task}", "what happened in {n}",
+    ],
+}
+
+
+def expand(templates, slots, per_template, rng):
+    examples = []
+    for label, patterns in templates.items():
+        for pattern in patterns:
+            seen = set()
+            for _ in range(per_template):
+                text = " ".join(pattern.format_map({k: rng.choice(v) for k, v in slots.items()}).split())
+                if text not in seen:
+                    seen.add(text)
+                    examples.append((label, text))
+    return examples
+
+
+def read_examples(path):
+    examples = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line and not line.startswith("#"):
+                    label, text = line.split("\t", 1)
+                    examples.append((label, text))
+    return examples
+
+
+def vectorize(texts, dim):
+    import numpy as np
+
+    X = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for index, value in hash_features(text, dim).items():
+            X[row, index] = value
+    return X
+
+
+def train(examples, dim=DEFAULT_DIM, epochs=300, lr=0.05, l2=1e-5, seed=0):
+    """Full-batch softmax regression with Adam; returns an IntentClassifier"""
+    import numpy as np
+
+    labels = sorted({label for label, _ in examples})
+    X = vectorize([text for _, text in examples], dim)
+    y = np.array([labels.index(label) for label, _ in examples])
+    Y = np.eye(len(labels), dtype=np.float32)[y]
+
+    rng = np.random.default_rng(seed)
+    W = rng.normal(0, 0.01, (dim, len(labels))).astype(np.float32)
+    b = np.zeros(len(labels), dtype=np.float32)
+    moments = [np.zeros_like(W), np.zeros_like(W), np.zeros_like(b), np.zeros_like(b)]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+    for step in range(1, epochs + 1):
+        scores = X @ W + b
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        error = (probs - Y) / len(X)
+        grads = [X.T @ error + l2 * W, error.sum(axis=0)]
+        for i, (param, grad) in enumerate(zip((W, b), grads)):
+            m, v = moments[2 * i], moments[2 * i + 1]
+            m *= beta1
+            m += (1 - beta1) * grad
+            v *= beta2
+            v += (1 - beta2) * grad * grad
+            param -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+        if step % 100 == 0:
+            loss = -np.log(probs[np.arange(len(y)), y] + 1e-9).mean()
+            print(f"  step {step}: loss {loss:.4f}")
+    return IntentClassifier(W, b, labels)
+
+
+def accuracy(predict, examples):
+    if not examples:
+        return None
+    return sum(predict(text) == label for label, text in examples) / len(examples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the routing intent classifier")
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--per-template", type=int, default=25)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    generated = expand(TEMPLATES, SLOTS, args.per_template, rng)
+    rng.shuffle(generated)
+    cut = int(len(generated) * (1 - args.holdout))
+    extra = read_examples(EXTRA_EXAMPLES)
+    train_set, holdout = generated[:cut] + extra, generated[cut:]
+    print(f"🧮 Training on {len(train_set)} examples ({len(extra)} hand-labelled), holding out {len(holdout)}")
+
+    model = train(train_set, dim=args.dim, epochs=args.epochs, seed=args.seed)
+    model.weights = model.weights.astype("float32")
+
+    from agents import rule_tool
+
+    print(f"📊 Holdout accuracy: classifier {accuracy(lambda t: model.predict(t)[0], holdout):.3f} · "
+          f"keyword rules {accuracy(rule_tool, holdout):.3f}")
+    print(f"📊 Hand-labelled accuracy: keyword rules {accuracy(rule_tool, extra) or 0:.3f}")
+
+    started = time.perf_counter()
+    for _, text in holdout:
+        model.predict(text)
+    print(f"⏱️ {(time.perf_counter() - started) / max(len(holdout), 1) * 1e6:.0f} µs per prediction")
+
+    model.save(args.out)
+    print(f"✅ Saved {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import re
+import threading
+from collections import OrderedDict
+
+# Tokens ending in "." that do not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "e.g", "i.e", "fig", "no",
+    "inc", "ltd", "co", "corp", "dept", "est", "approx", "jan", "feb", "mar", "apr", "jun", "jul", "aug",
+    "sep", "sept", "oct", "nov", "dec", "u.s", "u.k", "a.m", "p.m",
+}
+# Longest piece sent to the model; opus-mt truncates at 512 tokens, and shorter inputs batch better
+MAX_SEGMENT_CHARS = 400
+
+_BOUNDARY = re.compile(r"([.!?…]+[\"')\]]*)(\s+)(?=[\"'(\[]?[A-Z0-9À-Ý])|(\n\s*\n|\n)")
+_CLAUSE = re.compile(r"(?<=[;,:])\s+")
+
+
+def _ends_with_abbreviation(text):
+    last = text.rsplit(None, 1)[-1].rstrip(".").lower() if text.strip() else ""
+    return last in ABBREVIATIONS or (len(last) == 1 and last.isalpha())
+
+
+def split_sentences(text):
+    """Split text into [(sentence, separator)] so that joining sentence + separator restores it"""
+    pieces = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if match.group(3) is not None:
+            end, gap_end = match.start(3), match.end(3)
+        else:
+            end, gap_end = match.end(1), match.end(2)
+            if _ends_with_abbreviation(text[start:end]):
+                continue
+        if text[start:end].strip():
+            pieces.append((text[start:end], text[end:gap_end]))
+        elif pieces:
+            sentence, separator = pieces[-1]
+            pieces[-1] = (sentence, separator + text[start:gap_end])
+        start = gap_end
+    if text[start:].strip():
+        pieces.append((text[start:], ""))
+    elif pieces:
+        sentence, separator = pieces[-1]
+        pieces[-1] = (sentence, separator + text[start:])
+    return pieces
+
+
+def _segments(sentence, limit=MAX_SEGMENT_CHARS):
+    """Break an over-long sentence at clause boundaries, then at word boundaries"""
+    if len(sentence) <= limit:
+        return [sentence]
+    segments = []
+    current = ""
+    for part in _CLAUSE.split(sentence):
+        words = part.split(" ") if len(part) > limit else [part]
+        for word in words:
+            if current and len(current) + 1 + len(word) > limit:
+                segments.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+    if current:
+        segments.append(current)
+    return segments
+
+
+class SentenceTranslator:
+    """Translate documents sentence by sentence with a shared per-sentence cache.
+
+    `get_pipeline` returns the translation pipeline (looked up per call so
+    the model can be evicted and reloaded meanwhile). Uncached sentences
+    from all input texts are deduplicated, sorted by length and translated in
+    padded batches, so one batch never pads a short sentence to a long one.
+    """
+
+    def __init__(self, get_pipeline, batch_size=16, cache_size=10000):
+        self.get_pipeline = get_pipeline
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, segment):
+        with self._lock:
+            translation = self._cache.get(segment)
+            if translation is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(segment)
+            self.hits += 1
+            return translation
+
+    def _store(self, translations):
+        with self._lock:
+            self._cache.update(translations)
+            for segment in translations:
+                self._cache.move_to_end(segment)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def translate(self, texts, batch_size=None):
+        """Translations of texts, in order; sentence breaks and whitespace are preserved"""
+        batch_size = batch_size or self.batch_size
+        layouts = []
+        known = {}
+        pending = []
+        for text in texts:
+            layout = []
+            for sentence, separator in split_sentences(text):
+                leading = sentence[:len(sentence) - len(sentence.lstrip())]
+                segments = [" ".join(s.split()) for s in _segments(sentence.strip())]
+                for segment in segments:
+                    if segment not in known:
+                        known[segment] = self._cached(segment)
+                        if known[segment] is None:
+                            pending.append(segment)
+                layout.append((leading, segments, separator))
+            layouts.append(layout)
+
+        pending.sort(key=len)
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            results = self.get_pipeline()(batch, batch_size=len(batch), truncation=True)
+            translated = {segment: r["translation_text"] for segment, r in zip(batch, results)}
+            known.update(translated)
+            self._store(translated)
+            with self._lock:
+                self.batches += 1
+
+        return [
+            "".join(leading + " ".join(known[s] for s in segments) + separator for leading, segments, separator in layout)
+            for layout in layouts
+        ]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "batches": self.batches,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            }
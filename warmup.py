@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ModelWarmer:
+    """Run representative inputs through each model on a background thread.
+
+    `targets` maps a model name to a zero-argument callable that exercises it.
+    Each call is made under `gate` (the tool's ToolGate) when given, so warm-up
+    counts against the same concurrency limit as user requests.
+    """
+
+    PENDING = "pending"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, targets, gate=None):
+        self.targets = dict(targets)
+        self.gate = gate
+        self.status = {name: {"state": self.PENDING, "seconds": None, "error": None} for name in self.targets}
+        self._done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        if not self.targets:
+            self._done.set()
+
+    def start(self):
+        """Start warming in the background; safe to call more than once"""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        print("🔥 Warming up models...")
+        for name, warm in self.targets.items():
+            self._update(name, state=self.WARMING)
+            started = time.perf_counter()
+            try:
+                with self.gate if self.gate is not None else nullcontext():
+                    warm()
+            except Exception as e:
+                print(f"❌ Warm-up failed for {name}: {e}")
+                self._update(name, state=self.FAILED, seconds=time.perf_counter() - started, error=str(e))
+            else:
+                seconds = time.perf_counter() - started
+                print(f"✅ {name} warm in {seconds:.2f}s")
+                self._update(name, state=self.READY, seconds=seconds)
+        self._done.set()
+        print("✅ Warm-up complete!")
+
+    def _update(self, name, **fields):
+        with self._lock:
+            self.status[name].update(fields)
+
+    def is_done(self):
+        """True once every target has been tried, whether or not it warmed"""
+        return self._done.is_set()
+
+    def failed(self):
+        """Names of the models whose warm-up failed"""
+        with self._lock:
+            return [name for name, entry in self.status.items() if entry["state"] == self.FAILED]
+
+    def is_ready(self):
+        """True once every model has warmed successfully; a failed warm-up is not retried and keeps this False"""
+        return self.is_done() and not self.failed()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def report(self):
+        with self._lock:
+            models = {name: dict(entry) for name, entry in self.status.items()}
+        failed = self.failed()
+        if not self.is_done():
+            status = "warming"
+        else:
+            status = "degraded" if failed else "ready"
+        return {"ready": status == "ready", "status": status, "failed": failed, "models": models}
+
+
+def start_health_server(warmer, port, host="0.0.0.0"):
+    """Serve GET /health: 200 once every model has warmed, 503 while warming or if any warm-up failed"""
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("/health", "/ready"):
+                self.send_error(404)
+                return
+            report = warmer.report()
+            body = json.dumps(report).encode("utf-8")
+            self.send_response(200 if report["ready"] else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    print(f"🩺 Health endpoint listening on http://{host}:{port}/health")
+    return server
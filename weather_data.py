@@ -0,0 +1,292 @@
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# wttr.in hourly slots are every 3 hours: "0", "300", ..., "2100"
+TIME_WINDOWS = {
+    "morning": (6, 12),
+    "afternoon": (12, 18),
+    "evening": (18, 22),
+    "tonight": (18, 24),
+    "night": (21, 24),
+}
+
+
+def _int(value, default=0):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _desc(entry):
+    return (entry.get("weatherDesc") or [{"value": ""}])[0]["value"].strip()
+
+
+class CurrentConditions:
+    __slots__ = ("temp_c", "temp_f", "feels_like_c", "feels_like_f", "humidity", "description",
+                 "wind_kmph", "wind_dir", "visibility", "pressure")
+
+    def __init__(self, current):
+        self.temp_c = _int(current.get("temp_C"))
+        self.temp_f = _int(current.get("temp_F"))
+        self.feels_like_c = _int(current.get("FeelsLikeC"))
+        self.feels_like_f = _int(current.get("FeelsLikeF"))
+        self.humidity = _int(current.get("humidity"))
+        self.description = _desc(current)
+        self.wind_kmph = _int(current.get("windspeedKmph"))
+        self.wind_dir = current.get("winddir16Point", "")
+        self.visibility = _int(current.get("visibility"))
+        self.pressure = _int(current.get("pressure"))
+
+
+class HourlySeries:
+    """One day's 3-hourly forecast stored column-wise in typed arrays"""
+
+    __slots__ = ("hours", "temp_c", "humidity", "chance_of_rain", "precip_mm", "wind_kmph", "descriptions")
+
+    def __init__(self, hourly):
+        self.hours = array("B", (_int(h.get("time")) // 100 for h in hourly))
+        self.temp_c = array("b", (_int(h.get("tempC")) for h in hourly))
+        self.humidity = array("B", (_int(h.get("humidity")) for h in hourly))
+        self.chance_of_rain = array("B", (_int(h.get("chanceofrain")) for h in hourly))
+        self.precip_mm = array("f", (_float(h.get("precipMM")) for h in hourly))
+        self.wind_kmph = array("H", (_int(h.get("windspeedKmph")) for h in hourly))
+        self.descriptions = tuple(_desc(h) for h in hourly)
+
+    def indices(self, start_hour=0, end_hour=24):
+        return [i for i, hour in enumerate(self.hours) if start_hour <= hour < end_hour]
+
+
+class DayForecast:
+    __slots__ = ("date", "max_c", "min_c", "avg_c", "hourly")
+
+    def __init__(self, day):
+        self.date = day.get("date", "")
+        self.max_c = _int(day.get("maxtempC"))
+        self.min_c = _int(day.get("mintempC"))
+        self.avg_c = _int(day.get("avgtempC"))
+        self.hourly = HourlySeries(day.get("hourly", []))
+
+
+class WeatherRecord:
+    """Everything one wttr.in format=j1 response says about a location"""
+
+    __slots__ = ("area", "country", "current", "days", "fetched_at", "local_observed")
+
+    def __init__(self, area, country, current, days, fetched_at, local_observed=None):
+        self.area = area
+        self.country = country
+        self.current = current
+        self.days = days
+        self.fetched_at = fetched_at
+        # Wall-clock time at the location when the conditions were observed (None if wttr.in omitted it)
+        self.local_observed = local_observed
+
+    @property
+    def location(self):
+        return f"{self.area}{', ' + self.country if self.country else ''}"
+
+    def local_now(self):
+        """Current time at the location, advanced from the observation time; server time if unknown"""
+        if self.local_observed is None:
+            return datetime.now()
+        return self.local_observed + timedelta(seconds=time.time() - self.fetched_at)
+
+
+def _local_time(value):
+    # localObsDateTime looks like "2024-01-15 03:41 PM"
+    try:
+        return datetime.strptime(value.strip(), "%Y-%m-%d %I:%M %p")
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_wttr(data, fallback_area):
+    """Parse a format=j1 payload once into a WeatherRecord; None if it has no current conditions"""
+    if not data.get("current_condition"):
+        return None
+    nearest_area = (data.get("nearest_area") or [{}])[0]
+    area = (nearest_area.get("areaName") or [{"value": fallback_area}])[0]["value"]
+    country = (nearest_area.get("country") or [{"value": ""}])[0]["value"]
+    days = tuple(DayForecast(day) for day in data.get("weather", []))
+    current = data["current_condition"][0]
+    return WeatherRecord(
+        area, country, CurrentConditions(current), days, time.time(), _local_time(current.get("localObsDateTime"))
+    )
+
+
+class WeatherRecordCache:
+    """Bounded LRU of WeatherRecords that expire `ttl` seconds after they were fetched"""
+
+    def __init__(self, ttl=900.0, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or time.time() - record.fetched_at > self.ttl:
+                self.misses += 1
+                return None
+            self._records.move_to_end(key)
+            self.hits += 1
+            return record
+
+    def put(self, key, record):
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def expires_in(self, key):
+        """Seconds until key's record expires (negative once stale, None if absent)"""
+        with self._lock:
+            record = self._records.get(key)
+            return None if record is None else record.fetched_at + self.ttl - time.time()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._records),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+# ---------------------------------------------------------------- answering from a record
+
+def format_current(record):
+    current = record.current
+    return f"""🌤️ Current Weather Information:
+                    📍 Location: {record.location}
+                    🌡️ Temperature: {current.temp_c}°C ({current.temp_f}°F)
+                    🌡️ Feels Like: {current.feels_like_c}°C ({current.feels_like_f}°F)
+                    ☁️ Condition: {current.description}
+                    💨 Wind: {current.wind_kmph} km/h {current.wind_dir}
+                    💧 Humidity: {current.humidity}%
+                    👁️ Visibility: {current.visibility} km
+                    🌪️ Pressure: {current.pressure} mb
+                    🕐 Updated: {datetime.fromtimestamp(record.fetched_at).strftime('%Y-%m-%d %H:%M')}
+                    """
+
+
+def _day_index(query_lower):
+    if "day after tomorrow" in query_lower:
+        return 2
+    if "tomorrow" in query_lower:
+        return 1
+    return 0
+
+
+def _window(query_lower):
+    for name, window in TIME_WINDOWS.items():
+        if re.search(rf"\b{name}\b", query_lower):
+            return name, window
+    return None, (0, 24)
+
+
+def _day_label(index, day):
+    return ["Today", "Tomorrow", "Day after tomorrow"][index] if index < 3 else day.date
+
+
+def _when(index, day, window_name):
+    """'tomorrow evening', 'this evening', 'tonight', 'today'"""
+    if window_name is None:
+        return _day_label(index, day).lower()
+    if index == 0:
+        return "tonight" if window_name in ("tonight", "night") else f"this {window_name}"
+    return f"{_day_label(index, day).lower()} {window_name}"
+
+
+def _format_daily(record, only=None):
+    lines = [f"📅 Forecast for {record.location}:"]
+    for index, day in enumerate(record.days):
+        if only is not None and index != only:
+            continue
+        slots = day.hourly.indices()
+        rain = max((day.hourly.chance_of_rain[i] for i in slots), default=0)
+        midday = min(slots, key=lambda i: abs(day.hourly.hours[i] - 12)) if slots else None
+        condition = day.hourly.descriptions[midday] if midday is not None else ""
+        lines.append(f"- {_day_label(index, day)} ({day.date}): {day.min_c}–{day.max_c}°C, {condition}, rain chance {rain}%")
+    return "\n".join(lines)
+
+
+def _format_rain(record, index, day, window_name, slots):
+    series = day.hourly
+    chances = [series.chance_of_rain[i] for i in slots]
+    precip = sum(series.precip_mm[i] for i in slots)
+    peak = max(chances, default=0)
+    when = _when(index, day, window_name)
+    verdict = "Likely" if peak >= 60 else "Possible" if peak >= 30 else "Unlikely"
+    hours = ", ".join(f"{series.hours[i]:02d}:00 {series.chance_of_rain[i]}%" for i in slots)
+    return (f"🌧️ Rain in {record.location} {when}: {verdict} (peak chance {peak}%, ~{precip:.1f} mm)\n"
+            f"⏱️ {hours}")
+
+
+def _format_series(record, index, day, window_name, slots, label, values, unit, emoji):
+    series = day.hourly
+    when = _when(index, day, window_name).capitalize()
+    points = [values[i] for i in slots]
+    if len(points) >= 2:
+        trend = "rising" if points[-1] > points[0] else "falling" if points[-1] < points[0] else "steady"
+    else:
+        trend = "steady"
+    hours = ", ".join(f"{series.hours[i]:02d}:00 {values[i]}{unit}" for i in slots)
+    return (f"{emoji} {label} in {record.location} — {when}: {min(points)}–{max(points)}{unit}, {trend}\n"
+            f"⏱️ {hours}")
+
+
+def answer_weather_query(record, query):
+    """Answer current-conditions and follow-up questions from a record without another fetch"""
+    query_lower = query.lower()
+    wants_forecast = any(word in query_lower for word in ["forecast", "next few days", "this week", "3 day", "three day"])
+    index = _day_index(query_lower)
+    window_name, window = _window(query_lower)
+
+    if wants_forecast and window_name is None and not any(w in query_lower for w in ["rain", "humid", "wind"]):
+        if index == 0:
+            return _format_daily(record)
+        if index < len(record.days):
+            return _format_daily(record, only=index)
+
+    if index == 0 and window_name is None and not any(
+        word in query_lower for word in ["rain", "umbrella", "trend", "later", "hourly"]
+    ):
+        return format_current(record)
+
+    if index >= len(record.days):
+        return format_current(record)
+    day = record.days[index]
+    slots = day.hourly.indices(*window)
+    if index == 0 and window_name is None:
+        # "later today": only what is still ahead at the location, not on this server
+        now_hour = record.local_now().hour
+        slots = [i for i in slots if day.hourly.hours[i] + 3 > now_hour] or slots
+    if not slots:
+        return format_current(record)
+
+    if "rain" in query_lower or "umbrella" in query_lower:
+        return _format_rain(record, index, day, window_name, slots)
+    if "humid" in query_lower:
+        return _format_series(record, index, day, window_name, slots, "Humidity", day.hourly.humidity, "%", "💧")
+    if "wind" in query_lower:
+        return _format_series(record, index, day, window_name, slots, "Wind", day.hourly.wind_kmph, " km/h", "💨")
+    return _format_series(record, index, day, window_name, slots, "Temperature", day.hourly.temp_c, "°C", "🌡️")
@@ -0,0 +1,161 @@
+import math
+import random
+import threading
+import time
+
+
+class PopularityTracker:
+    """Exponentially decayed query counts per key, so recent popularity outweighs old.
+
+    A query's weight halves every `half_life` seconds. The tracker also keeps
+    hit/miss counts for the keys currently marked hot, which is the hit ratio
+    that background refreshing is supposed to push towards 1.
+    """
+
+    def __init__(self, half_life=3600.0, max_keys=1024):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.hot = frozenset()
+        self.hot_hits = 0
+        self.hot_lookups = 0
+        self._entries = {}  # key -> [score, updated_at, location]
+        self._lock = threading.Lock()
+
+    def _decayed(self, entry, now):
+        return entry[0] * math.pow(0.5, (now - entry[1]) / self.half_life)
+
+    def record(self, key, location, hit):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [1.0, now, location]
+                if len(self._entries) > self.max_keys:
+                    coldest = min(self._entries, key=lambda k: self._decayed(self._entries[k], now))
+                    del self._entries[coldest]
+            else:
+                entry[0] = self._decayed(entry, now) + 1.0
+                entry[1] = now
+                entry[2] = location
+            if key in self.hot:
+                self.hot_lookups += 1
+                self.hot_hits += int(hit)
+
+    def top(self, k):
+        """The k most popular keys right now: [(key, location, score)]"""
+        now = time.time()
+        with self._lock:
+            scored = [(key, entry[2], self._decayed(entry, now)) for key, entry in self._entries.items()]
+        scored.sort(key=lambda item: -item[2])
+        return scored[:k]
+
+    def mark_hot(self, keys):
+        with self._lock:
+            self.hot = frozenset(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self._entries),
+                "hot": len(self.hot),
+                "hot_hits": self.hot_hits,
+                "hot_lookups": self.hot_lookups,
+                "hot_hit_ratio": round(self.hot_hits / self.hot_lookups, 3) if self.hot_lookups else None,
+            }
+
+
+class CacheRefresher:
+    """Refresh the top-K popular keys on a background thread before their cache entries expire.
+
+    `refresh(key, location)` re-fetches one entry and returns truthy on
+    success; `expires_in(key)` returns seconds until expiry (None if absent).
+    Refreshes are spaced at most `max_rate` per second with +/-`jitter`
+    randomization, so a batch of keys cached together does not hit the
+    upstream in a burst.
+    """
+
+    def __init__(self, tracker, refresh, expires_in, top_k=10, refresh_ahead=120.0,
+                 max_rate=0.5, jitter=0.5, interval=15.0, min_score=2.0):
+        self.tracker = tracker
+        self.refresh = refresh
+        self.expires_in = expires_in
+        self.top_k = top_k
+        self.refresh_ahead = refresh_ahead
+        self.max_rate = max_rate
+        self.jitter = jitter
+        self.interval = interval
+        self.min_score = min_score
+        self.refreshes = 0
+        self.failures = 0
+        self.cycles = 0
+        self.last_refresh = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start refreshing in the background; safe to call more than once. A top K or rate of 0 disables it."""
+        with self._lock:
+            if self._thread is not None or self.top_k <= 0 or self.max_rate <= 0:
+                return
+            self._thread = threading.Thread(target=self._run, name="weather-refresh", daemon=True)
+            self._thread.start()
+        print(f"♻️ Weather cache refresher started (top {self.top_k}, ≤{self.max_rate}/s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _jittered(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _run(self):
+        while not self._stop.wait(self._jittered(self.interval)):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Weather cache refresh cycle failed: {e}")
+
+    def due(self):
+        """Popular keys whose entries are missing or expire within the refresh-ahead window, soonest first"""
+        popular = [item for item in self.tracker.top(self.top_k) if item[2] >= self.min_score]
+        self.tracker.mark_hot(key for key, _, _ in popular)
+        due = []
+        for key, location, _ in popular:
+            remaining = self.expires_in(key)
+            if remaining is None or remaining < self.refresh_ahead:
+                due.append((remaining if remaining is not None else float("-inf"), key, location))
+        due.sort(key=lambda item: item[0])
+        return [(key, location) for _, key, location in due]
+
+    def run_once(self):
+        """One refresh pass; returns how many entries were refreshed"""
+        if self.max_rate <= 0:
+            return 0
+        self.cycles += 1
+        refreshed = 0
+        for index, (key, location) in enumerate(self.due()):
+            if index and self._stop.wait(self._jittered(1.0 / self.max_rate)):
+                break
+            try:
+                ok = self.refresh(key, location)
+            except Exception as e:
+                print(f"❌ Background refresh failed for {location}: {e}")
+                ok = False
+            if ok:
+                refreshed += 1
+                self.refreshes += 1
+                self.last_refresh = time.time()
+            else:
+                self.failures += 1
+        return refreshed
+
+    def stats(self):
+        return {
+            "running": self._thread is not None and not self._stop.is_set(),
+            "cycles": self.cycles,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_refresh": self.last_refresh,
+            "top": [(location, round(score, 2)) for _, location, score in self.tracker.top(self.top_k)],
+            **self.tracker.stats(),
+        }